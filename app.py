@@ -1,26 +1,183 @@
+import hmac
 import os
-from flask import Flask, render_template, redirect, request
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import scoped_session, sessionmaker
-from datetime import datetime
+import re
+import sqlite3
+import threading
+from flask import (
+    Flask, abort, jsonify, make_response, render_template, redirect, request, send_from_directory,
+    stream_template,
+)
+from functools import lru_cache
+from types import MappingProxyType
+
+from catalog import day_start, get_catalog, is_active, on_reload, prepare_row, today_cutoff
+from critical_styles import CriticalCss
+from facets import facet_groups, selected_filters
+from helpers import AssetUrls
+from http_cache import conditional
+from image_variants import ResponsiveImages
+from pagination import paginate
+from script_bundles import ScriptBundles
+import query_counter
+from query_counter import query_budget
+import server_timing
+from server_timing import timed
+from template_cache import bytecode_cache
+
+# SQLAlchemy, setup_db and search_index are imported on first use, so pages
+# that never touch the database (/about-us, /community, ...) don't pay for
+# them on a serverless cold start.
 
 app = Flask(__name__)
+# Maximum number of ranked hits /search returns
+app.config["SEARCH_TOP_K"] = int(os.environ.get("SEARCH_TOP_K", 50))
+# Number of course detail lookups kept in the per-slug LRU cache
+COURSE_DETAIL_CACHE_SIZE = int(os.environ.get("COURSE_DETAIL_CACHE_SIZE", 256))
+# Stream /courses-all as it renders instead of paging it (also ?stream=1)
+app.config["STREAM_LISTINGS"] = os.environ.get("STREAM_LISTINGS") == "1"
+# Mixed into every ETag so a new deploy invalidates cached pages
+app.config["ETAG_SALT"] = os.environ.get("VERCEL_GIT_COMMIT_SHA", "")
+# Send each request's db/rows/render/total breakdown as a Server-Timing header
+app.config["SERVER_TIMING"] = os.environ.get("SERVER_TIMING", "1") != "0"
+# Shared secret for /_internal/ endpoints (X-Internal-Token header). Without
+# one they only answer local requests, and never on Vercel.
+app.config["INTERNAL_TOKEN"] = os.environ.get("INTERNAL_TOKEN", "")
+
+# Raise instead of logging when a request runs over its query budget or
+# repeats a statement like an N+1 loop (query_counter.py); meant for tests
+app.config["QUERY_BUDGET_STRICT"] = os.environ.get("QUERY_BUDGET_STRICT") == "1"
+
+server_timing.init_app(app)
+query_counter.init_app(app)
+
+# Compiled templates persist across cold starts (template_cache.py)
+app.jinja_env.bytecode_cache = bytecode_cache()
+
+# Fingerprinted asset URLs for templates, from static/manifest.json (helpers.py --fingerprint)
+asset_url = AssetUrls()
+app.jinja_env.globals["asset_url"] = asset_url
+
+# <picture>/srcset markup for image variants (responsive_images.py)
+responsive_images = ResponsiveImages(asset_url)
+app.jinja_env.globals["picture_sources"] = responsive_images.picture_sources
+app.jinja_env.globals["responsive_attrs"] = responsive_images.responsive_attrs
+
+# Inline above-the-fold CSS and non-blocking stylesheets (critical_css.py builds it)
+critical_css = CriticalCss(asset_url)
+app.jinja_env.globals["critical_styles"] = critical_css.critical_styles
+app.jinja_env.globals["stylesheet"] = critical_css.stylesheet
+
+# One deferred bundle per template instead of blocking <script>s (js_bundle.py)
+script_bundles = ScriptBundles(asset_url)
+app.jinja_env.globals["script"] = script_bundles.script
+
+# Hashed files never change, so they can be cached for a year
+ASSET_MAX_AGE = 31536000
+HASHED_NAME_RE = re.compile(r"^(.+)\.[0-9a-f]{10}(\.[^./]+)$")
+
+# Read-side tuning applied to every pooled connection. The app never writes,
+# so query_only guards against accidental writes through a shared connection.
+READ_PRAGMAS = [
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA query_only=1",
+]
+
+_engine = None
+_db = None
+_engine_lock = threading.Lock()
+
+
+def set_sqlite_pragmas(dbapi_conn, connection_record):
+    cur = dbapi_conn.cursor()
+    try:
+        # WAL lets readers run alongside a writer such as recrawl_courses.py
+        cur.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.OperationalError:
+        pass  # read-only snapshot, stays in its build-time journal mode
+    for pragma in READ_PRAGMAS:
+        cur.execute(pragma)
+    cur.close()
+
+
+def get_engine():
+    """Resolve the database and create the engine on first use."""
+    global _engine, _db
+    if _engine is not None:
+        return _engine
+
+    with _engine_lock:
+        if _engine is None:
+            from sqlalchemy import create_engine, event
+            from sqlalchemy.orm import scoped_session, sessionmaker
+            from setup_db import resolve_db
+
+            # Use local SQLite database. On Vercel the filesystem is read-only except
+            # /tmp, so resolve_db() opens the shipped snapshot or builds a database there.
+            db_path, db_url = resolve_db()
+            engine = create_engine(
+                db_url,
+                pool_size=int(os.environ.get("DB_POOL_SIZE", 5)),
+                max_overflow=int(os.environ.get("DB_POOL_OVERFLOW", 10)),
+            )
+            event.listen(engine, "connect", set_sqlite_pragmas)
+            server_timing.instrument_engine(engine)
+            query_counter.instrument_engine(engine)
+
+            # One session per thread, handed back to the pool when the request ends
+            _db = scoped_session(sessionmaker(bind=engine))
+            _engine = engine
+    return _engine
+
+
+def get_db():
+    get_engine()
+    return _db
+
+
+@app.teardown_appcontext
+def remove_session(exc=None):
+    if _db is not None:
+        _db.remove()
+
+
+def current_catalog():
+    return get_catalog(get_engine())
+
+
+def catalog_stamp():
+    catalog = current_catalog()
+    return catalog.version, catalog.mtime
+
+def paged_response(body, page):
+    """Response for one page of a listing, with rel=prev/next Link headers."""
+    response = make_response(body)
+    links = page.link_header()
+    if links:
+        response.headers["Link"] = links
+    return response
+
+# Templates that only render with data from their view
+VIEW_TEMPLATES = {"detail_product.html", "courses.html", "courses-all.html"}
+
+# Pages the catch-all route can serve, indexed once at startup. Only *.html,
+# so editor backups such as contact-us.html.bak are never served.
+PAGE_TEMPLATES = frozenset(
+    name for name in os.listdir(os.path.join(app.root_path, app.template_folder))
+    if name.endswith(".html") and name not in VIEW_TEMPLATES
+)
 
-# Use local SQLite database
-# On Vercel, the filesystem is read-only except /tmp, so create DB there
-if os.environ.get("VERCEL"):
-    DB_PATH = "/tmp/local.db"
-else:
-    DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "local.db")
 
-# Auto-initialize DB if it doesn't exist (needed for Vercel cold starts)
-if not os.path.exists(DB_PATH):
-    from setup_db import setup
-    setup()
+@lru_cache(maxsize=1)
+def not_found_page():
+    """404.html rendered once; it does not depend on the request."""
+    return render_template("404.html")
+
+
+def not_found():
+    return not_found_page(), 404
 
-engine = create_engine(f"sqlite:///{DB_PATH}")
-db = scoped_session(sessionmaker(bind=engine))
-s = db()
 
 # Sentry (optional - disabled for local dev)
 # import sentry_sdk
@@ -33,122 +190,222 @@ s = db()
 
 @app.route("/")
 @app.route("/index.html")
+@conditional("index.html", catalog_stamp)
+@query_budget(0)
 def index():
-    result = s.execute(text("SELECT * FROM events WHERE status=1 LIMIT 6"))
-    listT = []
-    for row in result:
-        row_as_dict = dict(row._mapping)
-        listT.append(row_as_dict)
-    return render_template("index.html", results=listT)
+    catalog = current_catalog()
+    return render_template("index.html", results=catalog.by_status.get(1, ())[:6])
+
+def listing_stamp():
+    """catalog_stamp() for pages that also change at midnight, when courses end."""
+    version, mtime = catalog_stamp()
+    cutoff = today_cutoff()
+    return f"{version}:{cutoff}", max(mtime, day_start(cutoff))
+
 
 @app.route("/courses")
 @app.route("/course.html")
+@conditional("courses.html", listing_stamp)
+@query_budget(0)
 def courses():
-    result = s.execute(text("SELECT * FROM events"))
-    listT = []
-    for row in result:
-        row_as_dict = dict(row._mapping)
-        listT.append(row_as_dict)
-    return render_template("courses.html", results=listT)
+    catalog = current_catalog()
+    selected = selected_filters()
+    rows, keys, counts = catalog.facets.filter(
+        selected, catalog.active_listing(today_cutoff()), catalog.name_keys
+    )
+    page = paginate(rows, keys)
+    return paged_response(
+        render_template("courses.html", results=page.items, page=page, facets=facet_groups(selected, counts)),
+        page,
+    )
 
 
 @app.route("/search")
+@conditional("courses.html", catalog_stamp)
+@query_budget(1)
 def search():
     query = request.args.get("query", "").strip()
+    catalog = current_catalog()
     if query:
-        result = s.execute(
-            text("SELECT * FROM events WHERE name LIKE :q"),
-            {"q": f"%{query}%"}
-        )
+        import search_index
+        hits = [(i, score) for i, score in search_index.search(get_db(), query, app.config["SEARCH_TOP_K"])
+                if i in catalog.by_id]
+        # Ranked hits page on (score, id), the order FTS returned them in
+        page = paginate([catalog.by_id[i] for i, _ in hits], [(score, i) for i, score in hits])
     else:
-        result = s.execute(text("SELECT * FROM events"))
-    listT = []
-    for row in result:
-        row_as_dict = dict(row._mapping)
-        listT.append(row_as_dict)
-    return render_template("courses.html", results=listT, search_query=query)
+        page = paginate(catalog.by_name, catalog.name_keys)
+    return paged_response(
+        render_template("courses.html", results=page.items, page=page, search_query=query), page
+    )
+
+
+# Suggestions change only when the catalog does, so browsers keep them for a
+# few minutes and the CDN for an hour, serving stale while it revalidates
+SUGGEST_MAX_AGE = 300
+SUGGEST_CDN_MAX_AGE = 3600
+SUGGEST_DEFAULT_LIMIT = 8
+
+
+@app.route("/search/suggest")
+@query_budget(0)
+def search_suggest():
+    """Typeahead for the search box: JSON suggestions for the ?q= prefix."""
+    import suggest
+    prefix = request.args.get("q", "")[:100]
+    try:
+        limit = int(request.args.get("limit", SUGGEST_DEFAULT_LIMIT))
+    except ValueError:
+        limit = SUGGEST_DEFAULT_LIMIT
+    limit = max(1, min(limit, suggest.MAX_SUGGESTIONS))
+
+    trie = suggest.get_trie(get_engine(), current_catalog())
+    response = jsonify(query=prefix, suggestions=trie.suggest(prefix, limit))
+    response.cache_control.public = True
+    response.cache_control.max_age = SUGGEST_MAX_AGE
+    response.cache_control.s_maxage = SUGGEST_CDN_MAX_AGE
+    response.cache_control.stale_while_revalidate = SUGGEST_CDN_MAX_AGE
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+# A course and its first assigned instructor in one round trip
+COURSE_DETAIL_SQL = """
+    SELECT e.*, i.id AS ins_id, i.name AS ins_name, i.bio AS ins_bio, i.img AS ins_img
+    FROM events e
+    LEFT JOIN events_instructor ei
+        ON ei.id = (SELECT MIN(id) FROM events_instructor WHERE event_id = e.id)
+    LEFT JOIN instructors i ON i.id = ei.instructor_id
+    WHERE e.slug = :s
+"""
+
+
+@lru_cache(maxsize=COURSE_DETAIL_CACHE_SIZE)
+def load_course_detail(slug):
+    """Return (course, instructor) for a slug, or None if there is no such course."""
+    from sqlalchemy import text
+    result = get_db().execute(text(COURSE_DETAIL_SQL), {"s": slug})
+    with timed("rows"):
+        row = result.first()
+        if row is None:
+            return None
+        course = prepare_row(dict(row._mapping))
+    ins = {}
+    if course.pop("ins_id") is not None:
+        ins = {"id": row.ins_id, "name": row.ins_name, "bio": row.ins_bio, "img": row.ins_img}
+    for key in ("ins_name", "ins_bio", "ins_img"):
+        del course[key]
+    return MappingProxyType(course), MappingProxyType(ins)
+
+
+@on_reload
+def _clear_course_detail_cache(catalog):
+    load_course_detail.cache_clear()
 
 
 @app.route("/product/<string:slug>")
 @app.route("/courses/<string:slug>")
+@conditional("detail_product.html", catalog_stamp)
+@query_budget(1)
 def course_detail(slug):
-    result = s.execute(text("SELECT * FROM events WHERE slug=:s"), {"s": slug})
-    course = []
-    for row in result:
-        row_as_dict = dict(row._mapping)
-        course.append(row_as_dict)
-
-    if len(course) == 0:
-        return render_template("404.html"), 404
-
-    course_ins = s.execute(text("SELECT * FROM events_instructor WHERE event_id=:id"), {"id": course[0]["id"]})
-    ins = []
-    for row in course_ins:
-        row_as_dict = dict(row._mapping)
-        ins.append(row_as_dict)
-
-    instructor_info = [{}]
-    if ins:
-        instructor_id = ins[0]["instructor_id"]
-        result = s.execute(text("SELECT * FROM instructors WHERE id=:id"), {"id": instructor_id})
-        instructor_info = []
-        for row in result:
-            row_as_dict = dict(row._mapping)
-            instructor_info.append(row_as_dict)
-        if not instructor_info:
-            instructor_info = [{}]
+    # Refreshes the catalog first, which clears stale cached details
+    current_catalog()
+    detail = load_course_detail(slug)
+    if detail is None:
+        return not_found()
+
+    course, ins = detail
+    return render_template("detail_product.html", data=course, ins=ins)
+
 
-    return render_template("detail_product.html", data=course[0], ins=instructor_info[0])
+def iter_listing_rows():
+    """Yield every course in name order straight from a server-side cursor."""
+    cutoff = today_cutoff()
+    with get_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=200).exec_driver_sql(
+            "SELECT * FROM events ORDER BY name, id"
+        )
+        for row in result:
+            course = prepare_row(dict(row._mapping))
+            course["active"] = is_active(course, cutoff)
+            yield course
 
 
 @app.route("/all-courses")
 @app.route("/courses-all")
+@conditional("courses-all.html", catalog_stamp)
+@query_budget(1)
 def courses_all():
-    result = s.execute(text("SELECT * FROM events ORDER BY name"))
-    info = []
-    for row in result:
-        row_as_dict = dict(row._mapping)
-        # Handle date strings from SQLite
-        end_date = row_as_dict.get("end_date")
-        if end_date:
-            if isinstance(end_date, str):
-                end_date = datetime.strptime(end_date, "%Y-%m-%d")
-            if datetime(end_date.year, end_date.month, end_date.day) > datetime(datetime.now().year, datetime.now().month, datetime.now().day):
-                row_as_dict["active"] = True
-            else:
-                row_as_dict["active"] = False
-        else:
-            row_as_dict["active"] = False
-        info.append(row_as_dict)
-    return render_template("courses-all.html", info=info)
+    if app.config["STREAM_LISTINGS"] or request.args.get("stream") == "1":
+        # Head and first cards go out while later rows are still being read
+        return stream_template("courses-all.html", info=iter_listing_rows())
+
+    catalog = current_catalog()
+    page = paginate(catalog.active_listing(today_cutoff()), catalog.name_keys)
+    return paged_response(render_template("courses-all.html", info=page.items, page=page), page)
+
+
+@app.route("/assets/<path:filename>")
+def fingerprinted_asset(filename):
+    original = asset_url.resolve(filename)
+    if original is None:
+        # A hash from an older build, or a path relative to a hashed stylesheet:
+        # serve the current file with the normal static caching
+        m = HASHED_NAME_RE.match(filename)
+        return app.send_static_file(m.group(1) + m.group(2) if m else filename)
+
+    response = send_from_directory(app.static_folder, original, max_age=ASSET_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def internal_request():
+    token = app.config["INTERNAL_TOKEN"]
+    if token:
+        return hmac.compare_digest(request.headers.get("X-Internal-Token", ""), token)
+    return not os.environ.get("VERCEL") and request.remote_addr in ("127.0.0.1", "::1")
+
+
+@app.route("/_internal/timings")
+def internal_timings():
+    """Rolling p50/p95/p99 of each route's db, rows, render and total time, in ms."""
+    if not internal_request():
+        abort(404)
+    response = jsonify(window=server_timing.SAMPLE_SIZE, routes=server_timing.stats.snapshot())
+    response.cache_control.no_store = True
+    return response
 
 
 @app.route("/instructors")
+@conditional("instructors.html")
 def instructors():
     return render_template("instructors.html")
 
 
 @app.route("/contact-us")
+@conditional("contact-us.html")
 def contact_us():
     return render_template("contact-us.html")
 
 
 @app.route("/about-us")
+@conditional("about-us.html")
 def about_us():
     return render_template("about-us.html")
 
 
 @app.route("/community")
+@conditional("community.html")
 def community():
     return render_template("community.html")
 
 
 @app.route("/<string:html>")
+@conditional(lambda html: html if html in PAGE_TEMPLATES else None)
 def other_file(html):
-    try:
-        return render_template(html)
-    except:
-        return render_template("404.html")
+    if html not in PAGE_TEMPLATES:
+        return not_found()
+    return render_template(html)
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Benchmark every route through the Flask test client.
+
+Each route is requested --warmup times untimed, then --iterations times
+timed. The script reports throughput and p50/p95/p99 latency per route and
+writes them to JSON. With --compare it also loads an earlier results file and
+exits non-zero if any route's latency regressed by more than --threshold
+(a fraction, 0.25 = 25% slower), ignoring differences under --min-delta ms.
+
+The first request to each route also counts its SQL queries; the script
+fails if any route goes over the @query_budget of its view or repeats a
+statement like an N+1 loop (see query_counter.py).
+
+Usage: python bench_routes.py [--iterations 50] [--warmup 5] [--out bench.json]
+                              [--compare baseline.json] [--threshold 0.25]
+                              [--match SUBSTRING]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from urllib.parse import quote
+
+from query_counter import count_queries
+from server_timing import percentile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+
+SEARCH_QUERIES = ["python", "math", "ap us history", "zzzz-no-match"]
+SUGGEST_PREFIXES = ["a", "hist", "python", "zzzz"]
+PERCENTILES = (50, 95, 99)
+
+
+def bench_routes():
+    """Every route worth timing: listings, search, typeahead, each course page and every static template."""
+    from app import current_catalog
+    from freeze import DYNAMIC_ROUTES, STATIC_ROUTES
+
+    routes = list(STATIC_ROUTES) + DYNAMIC_ROUTES
+    routes += [f"/search?query={quote(q)}" for q in SEARCH_QUERIES]
+    routes += [f"/search/suggest?q={quote(p)}" for p in SUGGEST_PREFIXES]
+    routes += [f"/product/{c['slug']}" for c in current_catalog().courses if c["slug"]]
+    routes += ["/" + name for name in sorted(os.listdir(TEMPLATES_DIR)) if name.endswith(".html")]
+    return routes
+
+
+def measure(client, route, iterations, warmup):
+    """Time `iterations` GETs of one route. Returns its result entry."""
+    path = quote(route, safe="/?=&%")
+    # Counted before any warmup, while per-route caches are still cold
+    with count_queries() as queries:
+        client.get(path)
+    for _ in range(warmup):
+        client.get(path)
+
+    latencies = []
+    status = None
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        response = client.get(path)
+        latencies.append(time.perf_counter() - t0)
+        status = response.status_code
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    entry = {"status": status, "rps": round(iterations / elapsed, 1),
+             "queries": queries.count, "query_problems": queries.problems}
+    for q in PERCENTILES:
+        entry[f"p{q}_ms"] = round(percentile(latencies, q) * 1000, 3)
+    return entry
+
+
+def run(routes, iterations, warmup):
+    from app import app
+
+    client = app.test_client()
+    return {route: measure(client, route, iterations, warmup) for route in routes}
+
+
+def compare(results, baseline, threshold, min_delta, metric):
+    """Return [(route, before ms, after ms)] for routes that got slower than allowed."""
+    regressions = []
+    for route, entry in results.items():
+        before = baseline.get(route)
+        if before is None:
+            continue
+        old, new = before[metric], entry[metric]
+        if new - old > min_delta and new > old * (1 + threshold):
+            regressions.append((route, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50, help="timed requests per route")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per route first")
+    parser.add_argument("--out", default="bench.json", help="results file (default: bench.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown as a fraction (default: 0.25)")
+    parser.add_argument("--min-delta", type=float, default=1.0,
+                        help="ignore slowdowns smaller than this many ms (default: 1.0)")
+    parser.add_argument("--metric", default="p50_ms", choices=[f"p{q}_ms" for q in PERCENTILES],
+                        help="latency compared against the baseline (default: p50_ms)")
+    parser.add_argument("--match", help="only benchmark routes containing this substring")
+    args = parser.parse_args()
+
+    routes = bench_routes()
+    if args.match:
+        routes = [r for r in routes if args.match in r]
+    results = run(routes, args.iterations, args.warmup)
+
+    width = max(len(r) for r in results)
+    print(f"{'route':<{width}}  status  queries      rps   p50 ms   p95 ms   p99 ms")
+    for route, e in results.items():
+        print(f"{route:<{width}}  {e['status']:>6} {e['queries']:>8} {e['rps']:>8} "
+              f"{e['p50_ms']:>8} {e['p95_ms']:>8} {e['p99_ms']:>8}")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({
+            "python": platform.python_version(),
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "routes": results,
+        }, f, indent=2)
+        f.write("\n")
+    print(f"Wrote {len(results)} routes to {args.out}")
+
+    problems = [p for e in results.values() for p in e["query_problems"]]
+    for problem in problems:
+        print(f"  QUERIES {problem}")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["routes"]
+        regressions = compare(results, baseline, args.threshold, args.min_delta, args.metric)
+        for route, old, new in regressions:
+            print(f"  REGRESSED {route}: {args.metric} {old} -> {new}")
+        if not regressions:
+            print(f"No route regressed more than {args.threshold:.0%} against {args.compare}")
+    if problems or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
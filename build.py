@@ -0,0 +1,103 @@
+"""
+Produce every build output the deployment reads: the files the Python
+function loads and the frozen pages served statically.
+
+Usage: python build.py [--check]
+
+Runs, in order:
+  1. setup_db.py --snapshot      snapshot.db
+  2. responsive_images.py        static/images/responsive/ (needs Pillow)
+  3. critical_css.py             static/css/critical/*.css
+  4. js_bundle.py                static/js/bundles/
+  5. helpers.py --fingerprint    static/manifest.json, covering the files above
+  6. template_cache.py           .jinja_cache/
+  7. freeze.py --write-vercel    build/, and vercel.json serving it
+
+These files are gitignored, and a git-triggered Vercel build cannot make
+them: the Python builder only installs requirements.txt. Without them the
+app still works, but cold starts rebuild the database in /tmp and pages go
+out without critical CSS, bundles or fingerprinted URLs. Deploy from a
+checkout where this has run, so the files are on disk when Vercel packages
+the function (freeze.INCLUDE_FILES / vercel.json includeFiles):
+
+    python build.py
+    vercel build --prod
+    vercel deploy --prebuilt --prod
+
+Step 7 rewrites the tracked vercel.json so the frozen pages under build/ are
+served as static files; the committed one routes everything to app.py.
+
+--check only reports which of the function's files are missing, and exits non-zero if
+any are.
+"""
+import glob
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Relative: vercel.json routes to it by this path (run from the repo root)
+FREEZE_DIR = "build"
+
+
+def missing_outputs():
+    from freeze import INCLUDE_FILES
+
+    return [pattern for pattern in INCLUDE_FILES if not glob.glob(os.path.join(BASE_DIR, pattern))]
+
+
+def step(label, fn):
+    print(f"== {label}")
+    started = time.perf_counter()
+    result = fn()
+    print(f"   done in {time.perf_counter() - started:.1f}s")
+    return result
+
+
+def build():
+    import setup_db
+    step("Database snapshot", setup_db.build_snapshot)
+
+    import responsive_images
+    built, skipped = step("Responsive image variants", responsive_images.build)
+    print(f"   {built} images built, {skipped} unchanged")
+
+    import critical_css
+    sizes = step("Critical CSS", critical_css.build)
+    print(f"   {len(sizes)} templates")
+
+    import js_bundle
+    report = step("Script bundles", js_bundle.build)
+    print(f"   {len(report)} templates")
+
+    import helpers
+    manifest = step("Asset manifest", helpers.build_manifest)
+    print(f"   {len(manifest)} assets")
+
+    import template_cache
+    from app import app
+    names = step("Template bytecode", lambda: template_cache.precompile(app.jinja_env))
+    print(f"   {len(names)} templates")
+
+    import freeze
+    written, failed = step("Frozen pages", lambda: freeze.freeze(FREEZE_DIR))
+    print(f"   {len(written)} pages, {freeze.write_assets(FREEZE_DIR)} fingerprinted assets")
+    freeze.write_vercel(FREEZE_DIR)
+    print("   updated vercel.json")
+    return failed
+
+
+def main():
+    failed = []
+    if "--check" not in sys.argv[1:]:
+        failed = build()
+    missing = missing_outputs()
+    for pattern in missing:
+        print(f"  MISSING {pattern}")
+    if missing or failed:
+        sys.exit(1)
+    print("All build outputs are present")
+
+
+if __name__ == "__main__":
+    main()
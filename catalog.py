@@ -0,0 +1,162 @@
+"""
+In-memory course catalog shared by the read routes.
+
+The events table is loaded once into an immutable Catalog, indexed by id, slug,
+status and name order. get_catalog() checks the database file on every call and
+swaps in a freshly loaded Catalog when it has changed; caches derived from the
+catalog register with on_reload() to be cleared at that point.
+"""
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from types import MappingProxyType
+
+from facets import FacetIndex
+from query_counter import uncounted
+from server_timing import timed
+
+_lock = threading.Lock()
+_catalog = None
+_reload_hooks = []
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# (today's day number, timestamp of the next local midnight)
+_cutoff = (0, 0.0)
+
+
+class Catalog:
+    """Immutable snapshot of the events table."""
+
+    def __init__(self, rows, version, mtime):
+        self.version = version
+        self.mtime = mtime
+        self._listing = None
+
+        for row in rows:
+            prepare_row(row)
+
+        # Rows in id order, the same order a plain SELECT returns them in
+        self.courses = tuple(MappingProxyType(row) for row in rows)
+        self.by_id = MappingProxyType({c["id"]: c for c in self.courses})
+        self.by_slug = MappingProxyType({c["slug"]: c for c in self.courses if c["slug"]})
+
+        by_status = {}
+        for c in self.courses:
+            by_status.setdefault(c["status"], []).append(c)
+        self.by_status = MappingProxyType({k: tuple(v) for k, v in by_status.items()})
+
+        self.by_name = tuple(sorted(self.courses, key=lambda c: (c["name"], c["id"])))
+        # (name, id) sort keys parallel to by_name, for keyset pagination
+        self.name_keys = tuple((c["name"], c["id"]) for c in self.by_name)
+        # Filter bitmaps over by_name, for /courses
+        self.facets = FacetIndex(self.by_name)
+
+    def active_listing(self, cutoff):
+        """Courses in name order with an `active` flag, rebuilt only when `cutoff` changes."""
+        listing = self._listing
+        if listing is None or listing[0] != cutoff:
+            rows = tuple(
+                MappingProxyType(dict(c, active=is_active(c, cutoff)))
+                for c in self.by_name
+            )
+            listing = self._listing = (cutoff, rows)
+        return listing[1]
+
+    def __len__(self):
+        return len(self.courses)
+
+
+def day_number(value):
+    """Days since 1970-01-01 for a DATE column value, or None if it is empty."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def day_start(day):
+    """Timestamp of local midnight at the start of day number `day`."""
+    return datetime.combine(date.fromordinal(day + _EPOCH_ORDINAL), datetime.min.time()).timestamp()
+
+
+def prepare_row(row):
+    """Add the fields derived from an events row at load time, in place."""
+    row["end_day"] = day_number(row.get("end_date"))
+
+    # "History, Grade 9, Grade 10" -> categories ("History",), levels ("Grade 9", "Grade 10")
+    grades = tuple(row["grade"].split(", ")) if row.get("grade") else ()
+    row["grades"] = grades
+    row["categories"] = tuple(g for g in grades if not g.startswith("Grade"))
+    row["grade_levels"] = tuple(g for g in grades if g.startswith("Grade"))
+    return row
+
+
+def is_active(row, cutoff):
+    return row["end_day"] is not None and row["end_day"] > cutoff
+
+
+def today_cutoff():
+    """Today's day number, recomputed only once the local date has changed."""
+    global _cutoff
+    day, expires = _cutoff
+    if time.time() >= expires:
+        today = date.today()
+        day = today.toordinal() - _EPOCH_ORDINAL
+        expires = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+        _cutoff = (day, expires)
+    return day
+
+
+def _db_stamp(path):
+    """Return (version, mtime) for the database file, including its WAL file."""
+    parts = []
+    mtime = 0.0
+    for p in (path, path + "-wal"):
+        try:
+            st = os.stat(p)
+        except FileNotFoundError:
+            continue
+        if p != path and not st.st_size:
+            # Readers create an empty WAL on connect and SQLite deletes it when
+            # the last connection closes; only WAL contents are a data change
+            continue
+        parts.append(f"{st.st_mtime_ns:x}-{st.st_size:x}")
+        mtime = max(mtime, st.st_mtime)
+    return ".".join(parts), mtime
+
+
+def load_catalog(engine, version="", mtime=0.0):
+    # Runs once per database change, not per request: keep it off query budgets
+    with uncounted(), engine.connect() as conn:
+        result = conn.exec_driver_sql("SELECT * FROM events ORDER BY id")
+        with timed("rows"):
+            rows = [dict(row._mapping) for row in result]
+    return Catalog(rows, version, mtime)
+
+
+def on_reload(fn):
+    """Register fn to be called whenever a new Catalog is swapped in."""
+    _reload_hooks.append(fn)
+    return fn
+
+
+def get_catalog(engine):
+    """Return the current Catalog, reloading it if the database has changed."""
+    global _catalog
+    path = engine.url.database
+    if path.startswith("file:"):
+        # URI-style filename used for the read-only snapshot
+        path = path[len("file:"):]
+    version, mtime = _db_stamp(path)
+    catalog = _catalog
+    if catalog is not None and catalog.version == version:
+        return catalog
+
+    with _lock:
+        if _catalog is None or _catalog.version != version:
+            _catalog = load_catalog(engine, version, mtime)
+            for fn in _reload_hooks:
+                fn(_catalog)
+        return _catalog
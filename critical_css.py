@@ -0,0 +1,187 @@
+"""
+Critical CSS: inline the above-the-fold rules of each page template.
+
+Build step: python critical_css.py [--templates]
+
+Renders every route, takes the elements of each page up to the end of its
+first section (the Webflow header and hero) as the fold, and keeps the rules
+of the page's local stylesheets that can match them, in stylesheet order. The
+result is written to static/css/critical/<template>.css.
+
+Templates call {{ critical_styles() }} in <head> and link local stylesheets
+through {{ stylesheet('css/<name>.css') }}. For a template with critical CSS
+these render an inline <style> and preload the full stylesheets without
+blocking first paint; without it they render the usual blocking <link>s, so
+templates work before the build has run. --templates rewrites the plain
+stylesheet <link>s in the templates to these helpers.
+
+The helpers themselves are in critical_styles.py. Check the output with
+python verify_critical.py.
+"""
+import os
+import posixpath
+import re
+import sys
+
+from critical_styles import CRITICAL_DIR, critical_path
+from css_prune import (
+    STATIC_DIR, TEMPLATES_DIR, PageAnalyzer, UsedSelectors, drop_unreferenced,
+    page_stylesheets, parse_css, prune, render_pages, serialize,
+)
+
+# Gzipped size the inline CSS should stay under: roughly what the first TCP
+# round trip (initial congestion window of 10 segments) can carry
+CRITICAL_BUDGET = 14 * 1024
+
+# The fold ends after this many section blocks, or this many elements
+FOLD_SECTIONS = 1
+FOLD_MAX_ELEMENTS = 400
+
+# The only runtime classes present at first paint: Webflow's inline <head>
+# script adds them to <html> before the body is parsed
+FIRST_PAINT_CLASSES = [r"w-mod-(js|touch)"]
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
+             "link", "meta", "source", "track", "wbr"}
+
+URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+LINK_RE = re.compile(
+    r"""<link (?:href="\{\{ asset_url\('(css/[^']+)'\) \}\}" rel="stylesheet" type="text/css"|"""
+    r"""rel="stylesheet" href="\{\{ asset_url\('(css/[^']+)'\) \}\}")>"""
+)
+
+
+def is_section(tag, attrs):
+    classes = (dict(attrs).get("class") or "").split()
+    return tag == "section" or "section" in classes or "w-section" in classes
+
+
+class FoldAnalyzer(PageAnalyzer):
+    """PageAnalyzer that stops recording at the end of the page's first section(s)."""
+
+    def __init__(self, safelist=FIRST_PAINT_CLASSES):
+        super().__init__(safelist)
+        self.in_body = False
+        self.done = False
+        self.elements = 0
+        self.fold_sections = 0
+        self._depth = 0
+        self._section_depth = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        super().handle_starttag(tag, attrs)
+        if tag == "body":
+            self.in_body = True
+            return
+        if not self.in_body:
+            return
+
+        self.elements += 1
+        if self.elements >= FOLD_MAX_ELEMENTS:
+            self.done = True
+        if tag in VOID_TAGS:
+            return
+        self._depth += 1
+        if self._section_depth is None and is_section(tag, attrs):
+            self._section_depth = self._depth
+
+    def handle_endtag(self, tag):
+        if self.done or not self.in_body or tag in VOID_TAGS:
+            return
+        if self._depth == self._section_depth:
+            self._section_depth = None
+            self.fold_sections += 1
+            if self.fold_sections >= FOLD_SECTIONS:
+                self.done = True
+        self._depth -= 1
+
+
+def absolute_urls(css, sheet):
+    """Rewrite url()s relative to a stylesheet so they still resolve when inlined."""
+    base = posixpath.dirname(sheet)
+
+    def replace(m):
+        url = m.group(2).strip()
+        if re.match(r"^(?:[a-z][a-z0-9+.-]*:|/|#)", url, re.I):
+            return m.group(0)
+        return 'url("/static/%s")' % posixpath.normpath(posixpath.join(base, url))
+
+    return URL_RE.sub(replace, css)
+
+
+def extract(used, sheets):
+    """The rules of `sheets` (static-relative paths, in link order) that `used` can match."""
+    parts = []
+    for sheet in sheets:
+        with open(os.path.join(STATIC_DIR, sheet), encoding="utf-8") as f:
+            nodes, _, _ = prune(parse_css(f.read()), used)
+        # @charset/@import are not valid inside an inline <style>, and fonts
+        # (often inlined as base64) arrive with the full stylesheet instead
+        nodes = [n for n in drop_unreferenced(nodes)
+                 if not (n[0] == "at" and (n[2] is None or n[1].lower().startswith("@font-face")))]
+        css = serialize(nodes)
+        if css:
+            parts.append(absolute_urls(css, sheet))
+    return "\n".join(parts) + "\n"
+
+
+def fold_selectors():
+    """
+    Render every route. Returns {template: (UsedSelectors, stylesheets, route)}
+    covering the fold of every page rendered from each template.
+    """
+    folds = {}
+    for route, template, html in render_pages():
+        analyzer = FoldAnalyzer()
+        analyzer.feed(html)
+        if template not in folds:
+            folds[template] = (UsedSelectors(FIRST_PAINT_CLASSES), page_stylesheets(analyzer), route)
+        folds[template][0].update(analyzer.used)
+    return folds
+
+
+def build():
+    """Write static/css/critical/<template>.css for every template. Returns {template: bytes}."""
+    os.makedirs(CRITICAL_DIR, exist_ok=True)
+    sizes = {}
+    for template, (used, sheets, _) in sorted(fold_selectors().items()):
+        if not sheets:
+            continue
+        css = extract(used, sheets)
+        with open(critical_path(template), "w", encoding="utf-8") as f:
+            f.write(css)
+        sizes[template] = len(css.encode())
+    return sizes
+
+
+def rewrite_templates():
+    """Route local stylesheet <link>s in templates through the stylesheet() helper."""
+    changed = 0
+    for name in sorted(os.listdir(TEMPLATES_DIR)):
+        if not name.endswith(".html"):
+            continue
+        path = os.path.join(TEMPLATES_DIR, name)
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        new_html = LINK_RE.sub(lambda m: "{{ stylesheet('%s') }}" % (m.group(1) or m.group(2)), html)
+        if new_html != html and "critical_styles()" not in new_html:
+            first = new_html.index("{{ stylesheet(")
+            indent = new_html[new_html.rindex("\n", 0, first) + 1:first]
+            new_html = new_html[:first] + "{{ critical_styles() }}\n" + indent + new_html[first:]
+        if new_html != html:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(new_html)
+            changed += 1
+    return changed
+
+
+if __name__ == "__main__":
+    if "--templates" in sys.argv[1:]:
+        print(f"Rewrote {rewrite_templates()} templates")
+    sizes = build()
+    for template, size in sizes.items():
+        print(f"  {template}: {size / 1024:.1f} KB critical CSS")
+    print(f"Wrote critical CSS for {len(sizes)} templates into {os.path.relpath(CRITICAL_DIR)}")
@@ -0,0 +1,55 @@
+"""
+Runtime side of critical CSS: the Jinja helpers that inline a template's
+critical CSS and load its stylesheets around it.
+
+The build step lives in critical_css.py, which pulls in the CSS parser and
+page crawler; this module is kept small because app.py imports it on every
+cold start.
+"""
+import os
+
+from jinja2 import pass_context
+from markupsafe import Markup, escape
+
+from helpers import STATIC_DIR
+
+CRITICAL_DIR = os.path.join(STATIC_DIR, "css", "critical")
+
+
+def critical_path(template):
+    return os.path.join(CRITICAL_DIR, os.path.splitext(template)[0] + ".css")
+
+
+class CriticalCss:
+    """Jinja helpers inlining critical CSS and loading stylesheets around it."""
+
+    def __init__(self, asset_url):
+        self.asset_url = asset_url
+        self._cache = {}
+
+    def css(self, template):
+        """The critical CSS of a template, or None if it has not been built."""
+        if template not in self._cache:
+            try:
+                with open(critical_path(template), encoding="utf-8") as f:
+                    self._cache[template] = f.read()
+            except (FileNotFoundError, TypeError):
+                self._cache[template] = None
+        return self._cache[template]
+
+    @pass_context
+    def critical_styles(self, context):
+        css = self.css(context.name)
+        if not css:
+            return Markup("")
+        return Markup("<style data-critical>%s</style>" % css.replace("</", "<\\/"))
+
+    @pass_context
+    def stylesheet(self, context, path):
+        href = escape(self.asset_url(path))
+        if not self.css(context.name):
+            return Markup(f'<link href="{href}" rel="stylesheet" type="text/css">')
+        return Markup(
+            f'<link href="{href}" rel="preload" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+            f'<noscript><link href="{href}" rel="stylesheet" type="text/css"></noscript>'
+        )
@@ -0,0 +1,431 @@
+"""
+Prune unused CSS using the pages the app actually renders.
+
+Renders every route through the Flask test client (the frozen routes, search,
+the 404 page and every template other_file can serve), collects the classes,
+ids and tags each page uses and the stylesheets it links, and writes copies
+of those stylesheets with every rule whose selectors match nothing removed.
+
+By default one pruned copy of each stylesheet is written for the whole site,
+to static/css/pruned/<name>. With --per-template a copy is written per page
+template instead, to static/css/pruned/<template>/<name>. Classes that
+webflow.js, bootstrap.js, swiper and main.js add at runtime are kept through
+SAFELIST; add more with --safelist.
+
+Usage: python css_prune.py [--per-template] [--out DIR] [--safelist CLASS ...]
+"""
+import argparse
+import os
+import re
+from collections import defaultdict
+from urllib.parse import quote, unquote, urlsplit
+
+from crawl_compare import HTMLAnalyzer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+OUT_DIR = os.path.join(STATIC_DIR, "css", "pruned")
+
+EXTRA_ROUTES = ["/search", "/search?query=python", "/courses/no-such-course"]
+
+# Classes added by JavaScript after load, as full-name regexes
+SAFELIST = [
+    r"w--[\w-]+",                   # webflow.js state: w--open, w--current, w--tab-active, ...
+    r"w-mod-[\w-]+",                # webflow.js feature flags on <html>
+    r"w-(active|condition-invisible|webflow-badge)",
+    r"w-nav-overlay[\w-]*",
+    r"w-lightbox[\w-]*",
+    r"w-form-(done|fail)",
+    r"w-file-upload[\w-]*",
+    r"w-slider[\w-]*",
+    r"w-dyn-[\w-]+",
+    r"swiper-[\w-]+",               # swiper.js and swiper.animate
+    r"animated|infinite",           # animate.css, toggled by swiper.animate
+    r"on1?|n|display-none",         # main.js, video.js
+    r"show|in|fade|collapsing|active|open|disabled",  # bootstrap.js
+    r"modal-[\w-]+|dropdown-backdrop|tooltip[\w-]*|popover[\w-]*|bs-[\w-]+",
+    r"carousel-item-[\w-]+",
+]
+
+# Tags that are always present even if no rendered page has them in markup
+ALWAYS_TAGS = {"html", "head", "body"}
+
+# At-rules whose block holds further rules; other blocks are kept whole
+NESTED_AT_RULES = ("@media", "@supports", "@document", "@-moz-document", "@layer")
+
+COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+PAREN_RE = re.compile(r"\([^()]*\)")
+ATTRIBUTE_RE = re.compile(r"\[[^\]]*\]")
+PSEUDO_RE = re.compile(r"(?<!\\)::?[\w-]+")
+CLASS_RE = re.compile(r"\.((?:\\.|[\w-])+)")
+ID_RE = re.compile(r"#((?:\\.|[\w-])+)")
+TAG_RE = re.compile(r"(?:^|[\s>+~(])([a-zA-Z][\w-]*)")
+ESCAPE_RE = re.compile(r"\\(.)")
+NEWLINE_RE = re.compile(r"\s*\n\s*")
+ANIMATION_RE = re.compile(r"(?:^|;)\s*(?:-webkit-)?animation(?:-name)?\s*:([^;!]*)", re.I)
+FONT_FAMILY_RE = re.compile(r"(?:^|;)\s*font(?:-family)?\s*:([^;!]*)", re.I)
+
+
+# --- CSS parsing ------------------------------------------------------------
+
+def _scan(text, pos, stops):
+    """Index of the first char in `stops` at or after pos, outside strings and parens."""
+    depth = 0
+    quote_char = None
+    n = len(text)
+    while pos < n:
+        ch = text[pos]
+        if quote_char:
+            if ch == "\\":
+                pos += 1
+            elif ch == quote_char:
+                quote_char = None
+        elif ch in "\"'":
+            quote_char = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(0, depth - 1)
+        elif depth == 0 and ch in stops:
+            return pos
+        pos += 1
+    return n
+
+
+def _block_end(text, pos):
+    """Index of the } closing the block that starts right after pos."""
+    depth = 1
+    while pos < len(text):
+        pos = _scan(text, pos, "{}")
+        if pos >= len(text):
+            return pos
+        depth += 1 if text[pos] == "{" else -1
+        if depth == 0:
+            return pos
+        pos += 1
+    return pos
+
+
+def parse_css(text, pos=0, end=None):
+    """
+    Parse a stylesheet into a list of nodes:
+      ("rule", selectors, body)   style rule, selectors split on commas
+      ("group", prelude, nodes)   @media/@supports block of nested nodes
+      ("at", prelude, body)       any other at-rule; body is None for statements
+    """
+    if end is None:
+        text = COMMENT_RE.sub("", text)
+        end = len(text)
+    nodes = []
+    while pos < end:
+        stop = min(_scan(text, pos, "{;}"), end)
+        prelude = text[pos:stop].strip()
+        if stop >= end or text[stop] == "}":
+            pos = stop + 1
+            continue
+        if text[stop] == ";":
+            if prelude:
+                nodes.append(("at", prelude, None))
+            pos = stop + 1
+            continue
+
+        close = _block_end(text, stop + 1)
+        if prelude.lower().startswith(NESTED_AT_RULES):
+            nodes.append(("group", prelude, parse_css(text, stop + 1, close)))
+        elif prelude.startswith("@"):
+            nodes.append(("at", prelude, text[stop + 1:close].strip()))
+        elif prelude:
+            selectors = [NEWLINE_RE.sub(" ", s.strip()) for s in split_selectors(prelude)]
+            # CSS strings cannot hold raw newlines, so this only squeezes layout
+            body = NEWLINE_RE.sub(" ", text[stop + 1:close].strip())
+            nodes.append(("rule", selectors, body))
+        pos = close + 1
+    return nodes
+
+
+def split_selectors(prelude):
+    parts = []
+    pos = 0
+    while pos <= len(prelude):
+        stop = _scan(prelude, pos, ",")
+        parts.append(prelude[pos:stop])
+        pos = stop + 1
+    return [p for p in parts if p.strip()]
+
+
+def serialize(nodes):
+    """Write nodes back out as compact CSS."""
+    out = []
+    for kind, head, body in nodes:
+        if kind == "rule":
+            out.append(f"{','.join(head)}{{{body}}}")
+        elif kind == "group":
+            inner = serialize(body)
+            if inner:
+                out.append(f"{head}{{{inner}}}")
+        elif body is None:
+            out.append(f"{head};")
+        else:
+            out.append(f"{head}{{{body}}}")
+    return "\n".join(out)
+
+
+# --- Selector matching ------------------------------------------------------
+
+class UsedSelectors:
+    """The classes, ids and tags seen on a set of rendered pages."""
+
+    def __init__(self, safelist=SAFELIST):
+        self.classes = set()
+        self.ids = set()
+        self.tags = set(ALWAYS_TAGS)
+        self.safelist = re.compile("|".join(f"(?:{p})" for p in safelist) or r"(?!)")
+
+    def update(self, other):
+        self.classes |= other.classes
+        self.ids |= other.ids
+        self.tags |= other.tags
+
+    def has_class(self, name):
+        return name in self.classes or self.safelist.fullmatch(name) is not None
+
+    def matches(self, selector):
+        """
+        Whether a selector could match a rendered page. Only simple selectors
+        are checked: pseudo-classes, attribute selectors and anything inside
+        :not()/:is() are ignored, so a kept selector may still match nothing.
+        """
+        s = selector
+        while True:
+            stripped = PAREN_RE.sub("", s)
+            if stripped == s:
+                break
+            s = stripped
+        s = PSEUDO_RE.sub("", ATTRIBUTE_RE.sub("", s))
+
+        for name in CLASS_RE.findall(s):
+            if not self.has_class(ESCAPE_RE.sub(r"\1", name)):
+                return False
+        for name in ID_RE.findall(s):
+            if ESCAPE_RE.sub(r"\1", name) not in self.ids:
+                return False
+        for name in TAG_RE.findall(CLASS_RE.sub("", ID_RE.sub("", s))):
+            if name.lower() not in self.tags:
+                return False
+        return True
+
+
+def prune(nodes, used):
+    """Drop rules whose selectors match nothing in `used`. Returns (nodes, kept, total)."""
+    pruned = []
+    kept = total = 0
+    for kind, head, body in nodes:
+        if kind == "rule":
+            total += len(head)
+            selectors = [s for s in head if used.matches(s)]
+            kept += len(selectors)
+            if selectors:
+                pruned.append((kind, selectors, body))
+        elif kind == "group":
+            inner, k, t = prune(body, used)
+            kept += k
+            total += t
+            if inner:
+                pruned.append((kind, head, inner))
+        else:
+            pruned.append((kind, head, body))
+    return pruned, kept, total
+
+
+def _declared(nodes, prop_re):
+    names = set()
+    for kind, _, body in nodes:
+        if kind == "rule":
+            for value in prop_re.findall(body):
+                names.update(n.strip("\"' ").lower() for n in re.split(r"[\s,]+", value))
+        elif kind == "group":
+            names |= _declared(body, prop_re)
+    return names
+
+
+def drop_unreferenced(nodes):
+    """Drop @keyframes and @font-face blocks no remaining rule refers to."""
+    animations = _declared(nodes, ANIMATION_RE)
+    families = _declared(nodes, FONT_FAMILY_RE)
+
+    def keep(node):
+        kind, head, body = node
+        if kind != "at":
+            return True
+        name = head.split(None, 1)
+        if name[0].lower().endswith("keyframes"):
+            return len(name) > 1 and name[1].strip("\"' ").lower() in animations
+        if name[0].lower() == "@font-face":
+            family = FONT_FAMILY_RE.search(body or "")
+            return family is None or family.group(1).strip("\"' ").lower() in families
+        return True
+
+    result = []
+    for node in nodes:
+        if node[0] == "group":
+            node = (node[0], node[1], [n for n in node[2] if keep(n)])
+        if keep(node):
+            result.append(node)
+    return result
+
+
+# --- Page collection --------------------------------------------------------
+
+class PageAnalyzer(HTMLAnalyzer):
+    """HTMLAnalyzer that also records ids and tag names."""
+
+    def __init__(self, safelist=SAFELIST):
+        super().__init__()
+        self.used = UsedSelectors(safelist)
+
+    def handle_starttag(self, tag, attrs):
+        super().handle_starttag(tag, attrs)
+        self.used.tags.add(tag)
+        for name, value in attrs:
+            if name == "id" and value:
+                self.used.ids.add(value)
+            elif name == "class" and value:
+                self.used.classes.update(value.split())
+            elif name == "swiper-animate-effect" and value:
+                self.used.classes.add(value)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+
+def all_routes():
+    from freeze import DYNAMIC_ROUTES, frozen_routes
+
+    yield from frozen_routes()
+    yield from DYNAMIC_ROUTES
+    yield from EXTRA_ROUTES
+    for name in sorted(os.listdir(TEMPLATES_DIR)):
+        if name.endswith(".html"):
+            yield "/" + name
+
+
+def stylesheet_file(href, asset_url):
+    """Map a stylesheet href on a rendered page to a static-relative path, or None."""
+    path = unquote(urlsplit(href).path)
+    if path.startswith(asset_url.prefix):
+        path = asset_url.resolve(path[len(asset_url.prefix):])
+    elif path.startswith("/static/"):
+        path = path[len("/static/"):]
+    else:
+        return None
+    if path and os.path.isfile(os.path.join(STATIC_DIR, path)):
+        return path
+    return None
+
+
+def render_pages():
+    """
+    Render every route through the test client. Yields (route, template, html)
+    for each HTML response, with the name of the template it was rendered from.
+    """
+    from flask import template_rendered
+
+    from app import app
+
+    rendered = []
+
+    def record(sender, template, context, **extra):
+        rendered.append(template.name)
+
+    template_rendered.connect(record, app)
+    client = app.test_client()
+    try:
+        for route in all_routes():
+            rendered.clear()
+            response = client.get(quote(route, safe="/?=&"))
+            if response.content_type.startswith("text/html"):
+                template = rendered[0] if rendered else route.lstrip("/")
+                yield route, template, response.get_data(as_text=True)
+    finally:
+        template_rendered.disconnect(record, app)
+
+
+def page_stylesheets(analyzer):
+    """Static-relative paths of the local stylesheets a page links, in order."""
+    from app import asset_url
+
+    paths = [stylesheet_file(href, asset_url) for href in analyzer.stylesheets]
+    return [p for p in paths if p]
+
+
+def collect(safelist=SAFELIST):
+    """
+    Render every route. Returns {template: (UsedSelectors, set of stylesheets)}
+    for the template each page was rendered from.
+    """
+    pages = {}
+    for _, template, html in render_pages():
+        analyzer = PageAnalyzer(safelist)
+        analyzer.feed(html)
+
+        used, sheets = pages.setdefault(template, (UsedSelectors(safelist), set()))
+        used.update(analyzer.used)
+        sheets.update(page_stylesheets(analyzer))
+    return pages
+
+
+def write_pruned(sheet, used, out_dir):
+    """Prune one stylesheet against `used` into out_dir. Returns (before, after, kept, total)."""
+    with open(os.path.join(STATIC_DIR, sheet), encoding="utf-8") as f:
+        source = f.read()
+    nodes, kept, total = prune(parse_css(source), used)
+    nodes = drop_unreferenced(nodes)
+    css = serialize(nodes) + "\n"
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, os.path.basename(sheet)), "w", encoding="utf-8") as f:
+        f.write(css)
+    return len(source.encode()), len(css.encode()), kept, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--per-template", action="store_true",
+                        help="write a pruned copy per page template instead of one site-wide copy")
+    parser.add_argument("--out", default=OUT_DIR, help="output directory (default: static/css/pruned)")
+    parser.add_argument("--safelist", nargs="*", default=[], metavar="CLASS",
+                        help="extra class names (regexes) to always keep")
+    args = parser.parse_args()
+
+    safelist = [*SAFELIST, *args.safelist]
+    pages = collect(safelist)
+    print(f"Rendered {len(pages)} templates")
+
+    if args.per_template:
+        targets = [(os.path.join(args.out, os.path.splitext(t)[0]), used, sheets)
+                   for t, (used, sheets) in sorted(pages.items())]
+    else:
+        by_sheet = defaultdict(lambda: UsedSelectors(safelist))
+        for used, sheets in pages.values():
+            for sheet in sheets:
+                by_sheet[sheet].update(used)
+        targets = [(args.out, used, {sheet}) for sheet, used in sorted(by_sheet.items())]
+
+    total_before = total_after = 0
+    for out_dir, used, sheets in targets:
+        for sheet in sorted(sheets):
+            before, after, kept, total = write_pruned(sheet, used, out_dir)
+            total_before += before
+            total_after += after
+            label = os.path.relpath(os.path.join(out_dir, os.path.basename(sheet)), args.out)
+            print(f"  {label}: {before / 1024:7.1f} KB -> {after / 1024:7.1f} KB"
+                  f"  ({kept}/{total} selectors kept)")
+
+    saved = total_before - total_after
+    print(f"Saved {saved / 1024:.1f} KB of {total_before / 1024:.1f} KB"
+          f" ({100 * saved / max(total_before, 1):.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Faceted filtering of the course listing.
+
+Each Catalog builds a FacetIndex when it loads. For every value of every
+facet it keeps a bitmap: an int whose bit i is set when the i-th course in
+name order has that value. Any combination of filters is then a handful of
+big-int ANDs, and the matching courses come out already in name order, ready
+for keyset pagination. Values picked within one facet are ORed together,
+different facets are ANDed.
+
+Counts follow the usual faceted-search rule: a facet's counts apply the
+filters of every other facet but not its own, so after picking "Math" the
+other categories still show how many courses picking them would add.
+"""
+import re
+from urllib.parse import urlencode
+
+from flask import request
+
+# (query parameter, heading) in display order
+FACETS = [
+    ("category", "Category"),
+    ("subject", "Subject"),
+    ("grade", "Grade level"),
+    ("status", "Status"),
+    ("price", "Price"),
+]
+FACET_PARAMS = [name for name, _ in FACETS]
+
+STATUSES = [("active", "Active"), ("complete", "Complete")]
+
+# (bucket, label, lowest, highest) in dollars, both ends inclusive
+PRICE_BUCKETS = [
+    ("free", "Free", 0, 0),
+    ("under-100", "Under $100", 0.01, 99.99),
+    ("100-199", "$100 to $199", 100, 199.99),
+    ("200-plus", "$200 and up", 200, float("inf")),
+]
+
+PRICE_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+NUMBER_RE = re.compile(r"\d+")
+
+
+def price_bucket(price):
+    """The PRICE_BUCKETS name for a price such as "$ 60.00 USD", or None."""
+    m = PRICE_RE.search(price or "")
+    if not m:
+        return None
+    value = float(m.group(0).replace(",", ""))
+    for bucket, _, low, high in PRICE_BUCKETS:
+        if low <= value <= high:
+            return bucket
+    return None
+
+
+def positions(mask):
+    """Indexes of the set bits of `mask`, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _value_order(facet, value):
+    if facet == "status":
+        return [s for s, _ in STATUSES].index(value)
+    if facet == "price":
+        return [b for b, _, _, _ in PRICE_BUCKETS].index(value)
+    # "Grade 4" < "Grade 10+"
+    return [int(n) for n in NUMBER_RE.findall(value)], value
+
+
+class FacetIndex:
+    """Per-value bitmaps over courses in name order."""
+
+    def __init__(self, courses):
+        self.size = len(courses)
+        self.all = (1 << self.size) - 1
+        self._status = None  # (listing, {status: bitmap})
+
+        index = {name: {} for name in FACET_PARAMS if name != "status"}
+        for i, c in enumerate(courses):
+            bit = 1 << i
+            values = {
+                "category": [c["category"]],
+                "subject": [c["subject"]],
+                "grade": c["grade_levels"],
+                "price": [price_bucket(c["price"])],
+            }
+            for facet, facet_values in values.items():
+                for value in facet_values:
+                    if value:
+                        index[facet][value] = index[facet].get(value, 0) | bit
+        self._index = index
+
+    def bitmaps(self, facet, listing):
+        """{value: bitmap} for one facet. Status depends on the day, so it comes from `listing`."""
+        if facet != "status":
+            return self._index[facet]
+        cached = self._status
+        if cached is None or cached[0] is not listing:
+            active = 0
+            for i, c in enumerate(listing):
+                if c["active"]:
+                    active |= 1 << i
+            cached = self._status = (listing, {"active": active, "complete": self.all & ~active})
+        return cached[1]
+
+    def match(self, facet, values, listing):
+        bitmaps = self.bitmaps(facet, listing)
+        mask = 0
+        for value in values:
+            mask |= bitmaps.get(value, 0)
+        return mask
+
+    def filter(self, selected, listing, keys):
+        """
+        Apply {facet: [values]} to `listing` (Catalog.active_listing(), with
+        `keys` its sort keys). Returns (rows, keys, {facet: [(value, count)]}).
+        """
+        masks = {facet: self.match(facet, values, listing) for facet, values in selected.items()}
+        combined = self.all
+        for mask in masks.values():
+            combined &= mask
+
+        counts = {}
+        for facet in FACET_PARAMS:
+            others = self.all
+            for other, mask in masks.items():
+                if other != facet:
+                    others &= mask
+            counts[facet] = sorted(
+                ((value, (bitmap & others).bit_count()) for value, bitmap in self.bitmaps(facet, listing).items()),
+                key=lambda item: _value_order(facet, item[0]),
+            )
+
+        if combined == self.all:
+            return listing, keys, counts
+        found = list(positions(combined))
+        return [listing[i] for i in found], [keys[i] for i in found], counts
+
+
+def selected_filters():
+    """{facet: [values]} picked in the current request's query string."""
+    selected = {}
+    for facet in FACET_PARAMS:
+        values = [v for v in request.args.getlist(facet) if v]
+        if values:
+            selected[facet] = values
+    return selected
+
+
+def _toggle_url(facet, value):
+    args = [(k, v) for k, v in request.args.items(multi=True) if k not in ("after", "before")]
+    if (facet, value) in args:
+        args.remove((facet, value))
+    else:
+        args.append((facet, value))
+    return f"{request.path}?{urlencode(args)}" if args else request.path
+
+
+def facet_groups(selected, counts):
+    """Template data: one group per facet with each value's label, count, state and toggle URL."""
+    labels = {"status": dict(STATUSES), "price": {b: label for b, label, _, _ in PRICE_BUCKETS}}
+    groups = []
+    for facet, heading in FACETS:
+        picked = selected.get(facet, ())
+        options = [
+            {
+                "value": value,
+                "label": labels.get(facet, {}).get(value, value),
+                "count": count,
+                "selected": value in picked,
+                "url": _toggle_url(facet, value),
+            }
+            for value, count in counts[facet]
+            if count or value in picked
+        ]
+        if options:
+            groups.append({"name": facet, "heading": heading, "options": options})
+    return groups
@@ -0,0 +1,179 @@
+"""
+Render every page of the site to static HTML for Vercel.
+
+Uses the Flask test client to render the fixed pages and every course page
+listed in the events table into an output directory (build/ by default).
+Fingerprinted assets (static/manifest.json) are copied under their hashed
+names into <out>/assets/. With --write-vercel it also rewrites vercel.json
+so those pages and assets are served as static files and only /courses,
+/search (and unknown URLs) reach the Python function.
+
+Usage: python freeze.py [--out build] [--write-vercel]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+from urllib.parse import quote
+
+from app import ASSET_MAX_AGE, app, current_catalog
+from facets import FACET_PARAMS
+from helpers import STATIC_DIR, load_manifest
+
+STATIC_ROUTES = [
+    "/",
+    "/courses-all",
+    "/about-us",
+    "/community",
+    "/instructors",
+    "/contact-us",
+]
+
+# Rendered by the app on every request, never frozen: /courses (and its
+# /course.html alias) counts courses by status against today's date, so a
+# frozen copy would go stale at midnight
+DYNAMIC_ROUTES = ["/courses"]
+
+# Extra URLs that render the same page as a frozen route
+ALIASES = {
+    "/index.html": "/",
+    "/all-courses": "/courses-all",
+}
+
+COURSE_PREFIXES = ["/product", "/courses"]
+
+# Frozen listing pages are only the first, unfiltered page; requests carrying
+# these query parameters are routed to the app instead of the static file
+PAGED_ROUTES = ["/courses-all", "/all-courses"]
+PAGE_QUERY_KEYS = ["after", "before", "limit"] + FACET_PARAMS
+
+# Build outputs the Python function reads at runtime
+INCLUDE_FILES = ["snapshot.db", "static/manifest.json", "static/css/critical/*.css",
+                 "static/js/bundles/bundles.json", "static/js/bundles/*.js",
+                 "static/images/responsive/variants.json", "static/images/responsive/*-*w.*",
+                 ".jinja_cache/*.cache"]
+
+
+def frozen_routes():
+    yield from STATIC_ROUTES
+    for course in current_catalog().courses:
+        if course["slug"]:
+            for prefix in COURSE_PREFIXES:
+                yield f"{prefix}/{course['slug']}"
+
+
+def output_path(route):
+    """Map a URL path to the file it is frozen into, relative to the output dir."""
+    if route == "/":
+        return "index.html"
+    return route.strip("/") + ".html"
+
+
+def freeze(out_dir):
+    """Render every frozen route into out_dir. Returns the list of routes written."""
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+
+    client = app.test_client()
+    written = []
+    failed = []
+    for route in frozen_routes():
+        response = client.get(quote(route))
+        if response.status_code != 200:
+            failed.append((route, response.status_code))
+            continue
+
+        path = os.path.join(out_dir, output_path(route))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(response.data)
+        written.append(route)
+
+    for route, status in failed:
+        print(f"  FAILED {route}: HTTP {status}")
+    return written, failed
+
+
+def write_assets(out_dir):
+    """Copy every fingerprinted asset to out_dir/assets/<hashed name>. Returns the count."""
+    manifest = load_manifest()
+    for original, hashed in manifest.items():
+        path = os.path.join(out_dir, "assets", hashed)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(os.path.join(STATIC_DIR, original), path)
+    return len(manifest)
+
+
+def vercel_config(out_dir):
+    """Build a vercel.json that serves frozen pages statically."""
+    base = out_dir.strip("/")
+    routes = [{"src": "^/static/(.*)$", "dest": "/static/$1"}]
+    # Hashed names never change content. Other /assets/ paths (url()s relative
+    # to a hashed stylesheet, stale hashes) fall through to the app.
+    routes.append({
+        "src": r"^/assets/(.+\.[0-9a-f]{10}(?:\.[^./]+)?)$",
+        "dest": f"/{base}/assets/$1",
+        "headers": {"Cache-Control": f"public, max-age={ASSET_MAX_AGE}, immutable"},
+        "check": True,
+    })
+
+    for route in PAGED_ROUTES:
+        for key in PAGE_QUERY_KEYS:
+            routes.append({
+                "src": f"^{re.escape(route)}$",
+                "has": [{"type": "query", "key": key}],
+                "dest": "app.py",
+            })
+
+    for route in STATIC_ROUTES:
+        src = "^/$" if route == "/" else f"^{re.escape(route)}$"
+        routes.append({"src": src, "dest": f"/{base}/{output_path(route)}"})
+    for alias, route in ALIASES.items():
+        routes.append({"src": f"^{re.escape(alias)}$", "dest": f"/{base}/{output_path(route)}"})
+
+    # Unknown slugs fall through to the app, which renders the 404 page
+    prefixes = "|".join(p.strip("/") for p in COURSE_PREFIXES)
+    routes.append({"src": f"^/({prefixes})/([^/]+)$", "dest": f"/{base}/$1/$2.html", "check": True})
+
+    routes.append({"src": "/(.*)", "dest": "app.py"})
+
+    return {
+        "version": 2,
+        "builds": [
+            {"src": f"{base}/**", "use": "@vercel/static"},
+            {"src": "static/**", "use": "@vercel/static"},
+            {"src": "app.py", "use": "@vercel/python", "config": {"includeFiles": INCLUDE_FILES}},
+        ],
+        "routes": routes,
+    }
+
+
+def write_vercel(out_dir):
+    with open("vercel.json", "w", encoding="utf-8") as f:
+        json.dump(vercel_config(out_dir), f, indent=2)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default="build", help="output directory (default: build)")
+    parser.add_argument("--write-vercel", action="store_true",
+                        help="rewrite vercel.json to serve the frozen pages")
+    args = parser.parse_args()
+
+    written, failed = freeze(args.out)
+    print(f"Froze {len(written)} pages into {args.out}/")
+    print(f"Copied {write_assets(args.out)} fingerprinted assets into {args.out}/assets/")
+
+    if args.write_vercel:
+        write_vercel(args.out)
+        print("Updated vercel.json")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
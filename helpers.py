@@ -1,6 +1,34 @@
+import hashlib
+import json
 import os
+import re
+import sys
+from urllib.parse import quote, unquote
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+MANIFEST_PATH = os.path.join(STATIC_DIR, "manifest.json")
+
+# Asset folders that get content-hashed names
+FINGERPRINT_DIRS = ["css", "js", "font", "fonts", "images"]
+
+# /static/<path> references inside attribute values, srcset lists and url()
+STATIC_REF_RE = re.compile(r"/static/([A-Za-z0-9_./%-]+?)(?=[\"'\s,)?#])")
+# ... and quoted string literals inside Jinja expressions
+JINJA_STATIC_REF_RE = re.compile(r"(['\"])/static/([A-Za-z0-9_./%-]+)\1")
+JINJA_BLOCK_RE = re.compile(r"(\{\{.*?\}\}|\{%.*?%\})", re.S)
+
+
+def add_static(fingerprint=False):
+    """
+    Point asset references in templates at /static/. With fingerprint=True,
+    rewrite /static/<path> references to {{ asset_url('<path>') }} for every
+    asset listed in the manifest instead.
+    """
+    if fingerprint:
+        return fingerprint_templates()
 
-def add_static():
     files = os.listdir(r"templates/")
     checks = os.listdir(r"static/")
     paths = []
@@ -21,4 +49,108 @@ def add_static():
 
             r.close()
 
-print(add_static())
\ No newline at end of file
+
+def hashed_name(path, digest):
+    """css/webflow.css -> css/webflow.<digest>.css"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest}{ext}"
+
+
+def build_manifest():
+    """Content-hash every fingerprinted asset and write static/manifest.json."""
+    manifest = {}
+    for folder in FINGERPRINT_DIRS:
+        for root, _, names in os.walk(os.path.join(STATIC_DIR, folder)):
+            for name in names:
+                full = os.path.join(root, name)
+                rel = os.path.relpath(full, STATIC_DIR).replace(os.sep, "/")
+                with open(full, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()[:10]
+                manifest[rel] = hashed_name(rel, digest)
+
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return manifest
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def fingerprint_templates():
+    """Rewrite /static/ asset references in templates to asset_url() calls."""
+    manifest = load_manifest() or build_manifest()
+    changed = 0
+    for name in sorted(os.listdir(TEMPLATES_DIR)):
+        if not name.endswith(".html"):
+            continue
+        path = os.path.join(TEMPLATES_DIR, name)
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        def replace(m):
+            asset = unquote(m.group(1))
+            if asset not in manifest:
+                return m.group(0)
+            return "{{ asset_url('%s') }}" % asset
+
+        def replace_in_jinja(m):
+            asset = unquote(m.group(2))
+            if asset not in manifest:
+                return m.group(0)
+            return "asset_url('%s')" % asset
+
+        # Odd-numbered parts are Jinja blocks, the rest is plain markup
+        parts = JINJA_BLOCK_RE.split(html)
+        for i, part in enumerate(parts):
+            if i % 2:
+                parts[i] = JINJA_STATIC_REF_RE.sub(replace_in_jinja, part)
+            else:
+                parts[i] = STATIC_REF_RE.sub(replace, part)
+        new_html = "".join(parts)
+        if new_html != html:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(new_html)
+            changed += 1
+    return changed
+
+
+class AssetUrls:
+    """Jinja helper resolving asset paths to fingerprinted URLs."""
+
+    def __init__(self, prefix="/assets/"):
+        self.prefix = prefix
+        self._manifest = None
+        self._reverse = None
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            self._manifest = load_manifest()
+            self._reverse = {v: k for k, v in self._manifest.items()}
+        return self._manifest
+
+    def __call__(self, path):
+        hashed = self.manifest.get(path)
+        if hashed is None:
+            return "/static/" + quote(path)
+        return self.prefix + quote(hashed)
+
+    def resolve(self, hashed):
+        """Map a fingerprinted path back to the file it was built from, or None."""
+        self.manifest
+        return self._reverse.get(hashed)
+
+
+if __name__ == "__main__":
+    if "--fingerprint" in sys.argv[1:]:
+        manifest = build_manifest()
+        print(f"Fingerprinted {len(manifest)} assets into {MANIFEST_PATH}")
+        print(f"Rewrote {add_static(fingerprint=True)} templates")
+    else:
+        print(add_static())
@@ -0,0 +1,123 @@
+"""
+Conditional GET support for rendered pages.
+
+A page's output only changes when its template source or the data behind it
+changes, so the ETag is a hash of the template source, the data version and
+ETAG_SALT (set per deploy so code changes also bust it), plus the mtimes of
+the build outputs the markup is rendered from (BUILD_OUTPUTS). Matching
+If-None-Match / If-Modified-Since requests get a 304 before the view runs. Both carry
+"Cache-Control: public, max-age=0, must-revalidate", so the CDN and browsers
+keep the page but check it on every use.
+"""
+import functools
+import hashlib
+import os
+from datetime import datetime, timezone
+
+from flask import current_app, make_response, request
+from jinja2 import TemplateNotFound
+
+# Build outputs under static/ that change the rendered markup: fingerprinted
+# URLs, script bundles and image variants. The template's critical CSS is
+# added per page in build_stamp().
+BUILD_OUTPUTS = (
+    "manifest.json",
+    os.path.join("js", "bundles", "bundles.json"),
+    os.path.join("images", "responsive", "variants.json"),
+)
+
+_template_digests = {}
+
+
+def template_digest(name):
+    """Return (sha1 of the template source, mtime), cached until the file changes."""
+    path = os.path.join(current_app.root_path, current_app.template_folder, name)
+    if not os.path.isfile(path):
+        raise TemplateNotFound(name)
+    mtime = os.path.getmtime(path)
+
+    cached = _template_digests.get(name)
+    if cached is not None and cached[1] == mtime:
+        return cached
+
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    _template_digests[name] = (digest, mtime)
+    return digest, mtime
+
+
+def build_stamp(template):
+    """Return (key, mtime) of the build outputs a rendered page depends on."""
+    paths = [os.path.join(current_app.static_folder, rel) for rel in BUILD_OUTPUTS]
+    paths.append(os.path.join(current_app.static_folder, "css", "critical",
+                              os.path.splitext(template)[0] + ".css"))
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.path.getmtime(path))
+        except OSError:
+            mtimes.append(0.0)
+    return ":".join(f"{m:.6f}" for m in mtimes), max(mtimes)
+
+
+def validators(template, version="", mtime=0.0):
+    """Return (etag, last_modified) for a template rendered against data `version`."""
+    digest, template_mtime = template_digest(template)
+    build, build_mtime = build_stamp(template)
+    salt = current_app.config.get("ETAG_SALT", "")
+    etag = hashlib.sha1(f"{digest}:{version}:{salt}:{build}".encode()).hexdigest()
+    modified = max(template_mtime, mtime, build_mtime)
+    return etag, datetime.fromtimestamp(int(modified), timezone.utc)
+
+
+def is_not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional(template, data=None):
+    """
+    Decorate a view that renders `template` so it sends ETag / Last-Modified
+    and answers conditional GETs with 304 without rendering.
+
+    `template` may be a callable taking the view's keyword arguments, for
+    routes that pick the template from the URL; it returns None when the URL
+    names no page. `data` is an optional callable returning (version, mtime)
+    for whatever the page is rendered from.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+
+            name = template(**kwargs) if callable(template) else template
+            if name is None:
+                # Not a page: the view answers without validators
+                return view(*args, **kwargs)
+            version, mtime = data() if data else ("", 0.0)
+            try:
+                etag, last_modified = validators(name, version, mtime)
+            except TemplateNotFound:
+                return view(*args, **kwargs)
+
+            if is_not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # Without Cache-Control, Last-Modified invites heuristic freshness:
+            # caches may store the page but must revalidate before every reuse
+            response.cache_control.public = True
+            response.cache_control.max_age = 0
+            response.cache_control.must_revalidate = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,63 @@
+"""
+Runtime side of the responsive images: the Jinja helpers rendering
+<picture> sources and srcset attributes from variants.json.
+
+The build step lives in responsive_images.py, which needs Pillow; this
+module is kept small because app.py imports it on every cold start.
+"""
+import json
+import os
+
+from markupsafe import Markup, escape
+
+from helpers import STATIC_DIR
+
+OUTPUT_DIR = "images/responsive"
+INDEX_PATH = os.path.join(STATIC_DIR, OUTPUT_DIR, "variants.json")
+
+
+def load_index():
+    try:
+        with open(INDEX_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class ResponsiveImages:
+    """Jinja helpers rendering srcset markup from variants.json."""
+
+    def __init__(self, asset_url):
+        self.asset_url = asset_url
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = load_index()
+        return self._index
+
+    def srcset(self, path, fmt):
+        entry = self.index.get(path)
+        if not entry or fmt not in entry["variants"]:
+            return ""
+        return ", ".join(f"{self.asset_url(p)} {w}w" for w, p in entry["variants"][fmt])
+
+    def picture_sources(self, path, sizes):
+        """<source> elements for the modern formats of an image, or nothing."""
+        sources = []
+        for fmt in ("avif", "webp"):
+            srcset = self.srcset(path, fmt)
+            if srcset:
+                sources.append(
+                    f'<source type="image/{fmt}" srcset="{escape(srcset)}" sizes="{escape(sizes)}">'
+                )
+        return Markup("".join(sources))
+
+    def responsive_attrs(self, path, sizes):
+        """srcset/sizes attributes for the fallback format of an image, or nothing."""
+        entry = self.index.get(path)
+        srcset = self.srcset(path, entry["fallback"]) if entry else ""
+        if not srcset:
+            return Markup("")
+        return Markup(f' srcset="{escape(srcset)}" sizes="{escape(sizes)}"')
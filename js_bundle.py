@@ -0,0 +1,296 @@
+"""
+Per-template JavaScript bundles.
+
+Build step: python js_bundle.py [--templates]
+
+For each template, takes the local scripts it loads (in order, each once),
+minifies the ones that are not already .min.js, and concatenates them into a
+bundle under static/js/bundles/ named by its content hash. Templates loading
+the same scripts share a bundle. static/js/bundles/bundles.json records which
+scripts each template's bundle replaces, and the asset manifest is refreshed
+if there is one. Prints the bytes and requests saved per page.
+
+Templates load local scripts through {{ script('js/<name>.js') }}. For a
+template with a bundle, the last of those calls renders one deferred <script>
+for the bundle and the others render nothing; deferred scripts still run in
+document order after parsing, so the scripts keep their relative order.
+Without a bundle each call renders the usual blocking <script>, so templates
+work before the build has run. --templates rewrites the plain local <script>
+tags in the templates to script() calls and removes tags for scripts that
+are not in static/js. The helper itself is in script_bundles.py.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+
+from helpers import MANIFEST_PATH, STATIC_DIR, TEMPLATES_DIR, build_manifest
+from script_bundles import BUNDLE_DIR, INDEX_PATH
+
+SCRIPT_TAG_RE = re.compile(
+    r"""<script src="\{\{ asset_url\('(js/[^']+)'\) \}\}"(?: type="text/javascript")?></script>"""
+)
+# Relative script paths from the Webflow export that no file backs
+DEAD_SCRIPT_RE = re.compile(r"""\n[ \t]*<script src="(js/[^"]+)"></script>""")
+SCRIPT_CALL_RE = re.compile(r"""\{\{ script\('(js/[^']+)'\) \}\}""")
+SOURCE_MAP_RE = re.compile(r"^\s*//[#@] sourceMappingURL=.*$", re.M)
+
+
+# --- Minification -----------------------------------------------------------
+
+# One lexical token of JavaScript; template literals and regex literals are
+# picked out by hand where a backtick or a slash starts
+TOKEN_RE = re.compile(
+    r"""(?P<str>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')"""
+    r"""|(?P<line_comment>//[^\n]*)"""
+    r"""|(?P<block_comment>/\*.*?\*/)"""
+    r"""|(?P<ws>\s+)"""
+    r"""|(?P<other>[^"'`/\s]+|["'`/])""",
+    re.S,
+)
+WORD_END_RE = re.compile(r"[\w$]+$")
+
+# A slash after one of these starts a regex literal rather than a division
+REGEX_AFTER_CHARS = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_AFTER_WORDS = {"return", "typeof", "case", "do", "else", "in", "instanceof",
+                     "new", "delete", "void", "throw", "yield", "await"}
+
+# A newline can go after or before these without changing what ASI does
+NEWLINE_DROP_AFTER = set("{[(,;")
+NEWLINE_DROP_BEFORE = set(")]},;")
+
+
+def _is_word(ch):
+    return ch.isalnum() or ch in "_$\\" or ord(ch) > 127
+
+
+def _regex_end(src, pos):
+    """End of the regex literal starting at src[pos] ('/'), or None if it is not one."""
+    i = pos + 1
+    in_class = False
+    while i < len(src):
+        ch = src[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == "\n":
+            return None
+        if in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+        elif ch == "/":
+            i += 1
+            while i < len(src) and _is_word(src[i]):
+                i += 1
+            return i
+        i += 1
+    return None
+
+
+def _template_end(src, pos):
+    """End of the template literal starting at src[pos] ('`')."""
+    i = pos + 1
+    while i < len(src):
+        ch = src[i]
+        if ch == "\\":
+            i += 2
+        elif ch == "`":
+            return i + 1
+        elif src.startswith("${", i):
+            depth = 1
+            i += 2
+            while i < len(src) and depth:
+                m = TOKEN_RE.match(src, i)
+                token = m.group(0)
+                if token == "`":
+                    i = _template_end(src, i)
+                    continue
+                depth += token.count("{") - token.count("}") if m.lastgroup == "other" else 0
+                i = m.end()
+        else:
+            i += 1
+    return len(src)
+
+
+def minify_js(src):
+    """
+    Strip comments (keeping /*! license */ ones) and squeeze whitespace.
+    Newlines are kept wherever dropping one could change automatic semicolon
+    insertion, so this is safe on code that relies on ASI.
+    """
+    out = []
+    pending = ""     # whitespace seen since the last token: "", " " or "\n"
+    last = ""        # last output character
+    last_word = ""   # identifier the output ends with, if any
+
+    def emit(token):
+        nonlocal pending, last, last_word
+        if pending and last:
+            first = token[0]
+            if pending == "\n":
+                if last not in NEWLINE_DROP_AFTER and first not in NEWLINE_DROP_BEFORE:
+                    out.append("\n")
+            elif (_is_word(last) and _is_word(first)) or (last in "+-/" and first == last):
+                out.append(" ")
+        pending = ""
+        out.append(token)
+        last = token[-1]
+        m = WORD_END_RE.search(token)
+        last_word = m.group(0) if m and m.end() == len(token) else ""
+
+    pos = 0
+    while pos < len(src):
+        m = TOKEN_RE.match(src, pos)
+        kind, token = m.lastgroup, m.group(0)
+
+        if kind == "ws":
+            pending = "\n" if "\n" in token or pending == "\n" else " "
+            pos = m.end()
+        elif kind == "line_comment":
+            # The newline that ends it is the next token
+            pending = pending or " "
+            pos = m.end()
+        elif kind == "block_comment":
+            if token.startswith("/*!"):
+                emit(token)
+                pending = "\n"
+            else:
+                pending = "\n" if "\n" in token or pending == "\n" else " "
+            pos = m.end()
+        elif token == "`":
+            end = _template_end(src, pos)
+            emit(src[pos:end])
+            pos = end
+        elif token == "/":
+            end = None
+            if not last or last in REGEX_AFTER_CHARS or last_word in REGEX_AFTER_WORDS:
+                end = _regex_end(src, pos)
+            end = end or pos + 1
+            emit(src[pos:end])
+            pos = end
+        else:
+            emit(token)
+            pos = m.end()
+    return "".join(out) + "\n"
+
+
+# --- Bundling ---------------------------------------------------------------
+
+def template_scripts(html):
+    """Local scripts a template loads, in order and without repeats."""
+    found = [m.group(1) or m.group(2) for m in
+             re.finditer(f"{SCRIPT_TAG_RE.pattern}|{SCRIPT_CALL_RE.pattern}", html)]
+    scripts = []
+    for path in found:
+        if path not in scripts and os.path.isfile(os.path.join(STATIC_DIR, path)):
+            scripts.append(path)
+    return scripts
+
+
+def bundle_source(scripts, cache):
+    parts = []
+    for path in scripts:
+        if path not in cache:
+            with open(os.path.join(STATIC_DIR, path), encoding="utf-8") as f:
+                src = f.read()
+            # Bundles ship without the source maps the originals point at
+            src = SOURCE_MAP_RE.sub("", src)
+            cache[path] = src if path.endswith(".min.js") else minify_js(src)
+        parts.append(cache[path].strip())
+    # The ; stops a file without a trailing semicolon running into the next
+    return "\n;".join(parts) + "\n"
+
+
+def _sizes(data):
+    return len(data), len(gzip.compress(data))
+
+
+def build():
+    """
+    Write the bundles and bundles.json. Templates loading the same scripts
+    share a bundle, so browsers cache it once. Returns
+    {template: (script count, (bytes, gzipped) before, (bytes, gzipped) after)}.
+    """
+    out_dir = os.path.join(STATIC_DIR, BUNDLE_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    index = {}
+    report = {}
+    minified = {}
+    bundles = {}
+    originals = {}
+    for name in sorted(os.listdir(TEMPLATES_DIR)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(TEMPLATES_DIR, name), encoding="utf-8") as f:
+            scripts = template_scripts(f.read())
+        if not scripts:
+            continue
+
+        key = tuple(scripts)
+        if key not in bundles:
+            source = bundle_source(scripts, minified).encode()
+            digest = hashlib.sha1(source).hexdigest()[:10]
+            bundle = f"{BUNDLE_DIR}/{digest}.js"
+            with open(os.path.join(STATIC_DIR, bundle), "wb") as f:
+                f.write(source)
+            bundles[key] = (bundle, _sizes(source))
+        bundle, after = bundles[key]
+        index[name] = {"bundle": bundle, "scripts": scripts}
+
+        for path in scripts:
+            if path not in originals:
+                with open(os.path.join(STATIC_DIR, path), "rb") as f:
+                    originals[path] = _sizes(f.read())
+        before = tuple(sum(originals[p][i] for p in scripts) for i in (0, 1))
+        report[name] = (len(scripts), before, after)
+
+    current = {os.path.basename(bundle) for bundle, _ in bundles.values()}
+    for stale in os.listdir(out_dir):
+        if stale.endswith(".js") and stale not in current:
+            os.remove(os.path.join(out_dir, stale))
+
+    with open(INDEX_PATH, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+        f.write("\n")
+    if os.path.exists(MANIFEST_PATH):
+        build_manifest()
+    return report
+
+
+def rewrite_templates():
+    """
+    Route local <script> tags in templates through the script() helper, and
+    drop the ones pointing at scripts that do not exist.
+    """
+    changed = 0
+    for name in sorted(os.listdir(TEMPLATES_DIR)):
+        if not name.endswith(".html"):
+            continue
+        path = os.path.join(TEMPLATES_DIR, name)
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        new_html = SCRIPT_TAG_RE.sub(lambda m: "{{ script('%s') }}" % m.group(1), html)
+        new_html = DEAD_SCRIPT_RE.sub(
+            lambda m: m.group(0) if os.path.isfile(os.path.join(STATIC_DIR, m.group(1))) else "", new_html
+        )
+        if new_html != html:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(new_html)
+            changed += 1
+    return changed
+
+
+if __name__ == "__main__":
+    if "--templates" in sys.argv[1:]:
+        print(f"Rewrote {rewrite_templates()} templates")
+    report = build()
+    saved = 0
+    for name, (count, before, after) in report.items():
+        saved += before[0] - after[0]
+        print(f"  {name}: {count} scripts -> 1 deferred bundle, "
+              f"{before[0] / 1024:.1f} KB -> {after[0] / 1024:.1f} KB "
+              f"(gzip {before[1] / 1024:.1f} KB -> {after[1] / 1024:.1f} KB)")
+    print(f"Bundled scripts for {len(report)} templates, {saved / 1024:.1f} KB saved across pages")
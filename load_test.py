@@ -0,0 +1,272 @@
+"""
+Load-test the app under a real multi-threaded or multi-process WSGI server.
+
+Starts the app on 127.0.0.1 in a separate process, so the clients do not
+share its GIL, and drives it with --clients concurrent keep-alive
+connections for --duration seconds. Paths are drawn from a traffic mix:
+MIX by default, or the GET requests of a combined-format access log with
+--log. Reports requests/second, latency percentiles and the error rate
+(connection failures and 5xx responses), overall and per kind of page.
+
+Servers: "threaded" (werkzeug, one thread per connection, the default),
+"waitress" (--workers threads) and "gunicorn" (--workers pre-forked
+processes). The last two need the package installed.
+
+Usage: python load_test.py [--server threaded] [--workers 4] [--clients 16]
+                           [--duration 10] [--log access.log]
+"""
+import argparse
+import http.client
+import importlib.util
+import logging
+import multiprocessing
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import quote
+
+from server_timing import percentile
+
+HOST = "127.0.0.1"
+
+# (kind, weight): the share of requests each kind of page gets
+MIX = [
+    ("course", 35),
+    ("home", 15),
+    ("courses", 15),
+    ("search", 15),
+    ("courses-all", 5),
+    ("page", 10),
+    ("static", 5),
+]
+STATIC_PAGES = ["/about-us", "/community", "/instructors", "/contact-us"]
+STATIC_ASSETS = ["/static/css/normalize.css", "/static/css/webflow.css", "/static/js/nav-current.js"]
+
+LOG_LINE_RE = re.compile(r'"GET (\S+) HTTP/[\d.]+"')
+
+
+# --- Servers ----------------------------------------------------------------
+
+def _run_werkzeug(ports):
+    from werkzeug.serving import make_server
+
+    from app import app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server(HOST, 0, app, threaded=True)
+    ports.put(server.port)
+    server.serve_forever()
+
+
+def _run_waitress(ports, threads):
+    from waitress import create_server
+
+    from app import app
+
+    server = create_server(app, host=HOST, port=0, threads=threads)
+    ports.put(server.effective_port)
+    server.run()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    sys.exit(f"Server did not start listening on port {port}")
+
+
+def start_server(kind, workers):
+    """Start the app in its own process. Returns (port, stop function)."""
+    if kind in ("waitress", "gunicorn") and importlib.util.find_spec(kind) is None:
+        sys.exit(f"{kind} is not installed: pip install {kind}")
+
+    if kind == "gunicorn":
+        port = _free_port()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-w", str(workers), "-b", f"{HOST}:{port}",
+             "--log-level", "warning", "app:app"],
+        )
+        _wait_for_port(port)
+        return port, lambda: (proc.terminate(), proc.wait())
+
+    # spawn, not fork: the child must open its own database connections
+    ctx = multiprocessing.get_context("spawn")
+    ports = ctx.Queue()
+    if kind == "waitress":
+        proc = ctx.Process(target=_run_waitress, args=(ports, workers), daemon=True)
+    else:
+        proc = ctx.Process(target=_run_werkzeug, args=(ports,), daemon=True)
+    proc.start()
+    port = ports.get(timeout=60)
+    _wait_for_port(port)
+    return port, lambda: (proc.terminate(), proc.join())
+
+
+# --- Traffic ----------------------------------------------------------------
+
+def default_paths():
+    """{kind: [paths]} for the kinds in MIX, filled from the catalog."""
+    from app import current_catalog
+
+    courses = [c for c in current_catalog().courses if c["slug"]]
+    words = sorted({w.lower() for c in courses for w in re.findall(r"[A-Za-z]{4,}", c["name"] or "")})
+    return {
+        "course": [f"/product/{quote(c['slug'])}" for c in courses],
+        "home": ["/"],
+        "courses": ["/courses"],
+        "search": [f"/search?query={quote(w)}" for w in words] or ["/search?query=math"],
+        "courses-all": ["/courses-all"],
+        "page": STATIC_PAGES,
+        "static": STATIC_ASSETS,
+    }
+
+
+def path_kind(path):
+    if path.startswith(("/product/", "/courses/")):
+        return "course"
+    if path.startswith("/search"):
+        return "search"
+    if path.startswith(("/static/", "/assets/")):
+        return "static"
+    return {"/": "home", "/courses": "courses", "/courses-all": "courses-all"}.get(path.split("?")[0], "page")
+
+
+class Traffic:
+    """Draws request paths according to a mix."""
+
+    def __init__(self, weighted_paths):
+        # [(path, weight)]
+        self.paths = [p for p, _ in weighted_paths]
+        self.weights = [w for _, w in weighted_paths]
+
+    @classmethod
+    def from_mix(cls, mix=MIX):
+        paths = default_paths()
+        weighted = []
+        for kind, weight in mix:
+            for path in paths[kind]:
+                weighted.append((path, weight / len(paths[kind])))
+        return cls(weighted)
+
+    @classmethod
+    def from_log(cls, log_path):
+        with open(log_path, encoding="utf-8", errors="replace") as f:
+            counts = Counter(m.group(1) for m in map(LOG_LINE_RE.search, f) if m)
+        if not counts:
+            sys.exit(f"No GET requests found in {log_path}")
+        return cls(counts.items())
+
+    def sample(self, rng):
+        return rng.choices(self.paths, self.weights)[0]
+
+
+# --- Clients ----------------------------------------------------------------
+
+def client_loop(port, traffic, deadline, seed, results, lock):
+    """One client: keep-alive requests until the deadline, recording (kind, seconds, ok)."""
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(HOST, port, timeout=30)
+    local = []
+    while time.monotonic() < deadline:
+        path = traffic.sample(rng)
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 500
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection(HOST, port, timeout=30)
+        local.append((path_kind(path), time.perf_counter() - t0, ok))
+    conn.close()
+    with lock:
+        results.extend(local)
+
+
+def run_load(port, traffic, clients, duration):
+    results = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=client_loop, args=(port, traffic, deadline, i, results, lock))
+        for i in range(clients)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - started
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(s for _, s, _ in samples)
+    errors = sum(1 for _, _, ok in samples if not ok)
+    return {
+        "requests": len(samples),
+        "rps": len(samples) / elapsed if elapsed else 0.0,
+        "errors": errors / len(samples) if samples else 0.0,
+        **{f"p{q}": percentile(latencies, q) * 1000 for q in (50, 95, 99)},
+        "max": latencies[-1] * 1000 if latencies else 0.0,
+    }
+
+
+def report(results, elapsed):
+    by_kind = defaultdict(list)
+    for sample in results:
+        by_kind[sample[0]].append(sample)
+
+    print(f"{'kind':<12} {'requests':>9} {'rps':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    rows = [("all", results)] + sorted(by_kind.items())
+    for kind, samples in rows:
+        s = summarize(samples, elapsed)
+        print(f"{kind:<12} {s['requests']:>9} {s['rps']:>8.1f} {s['errors']:>7.2%} "
+              f"{s['p50']:>8.2f} {s['p95']:>8.2f} {s['p99']:>8.2f} {s['max']:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--server", default="threaded", choices=["threaded", "waitress", "gunicorn"])
+    parser.add_argument("--workers", type=int, default=4,
+                        help="waitress threads or gunicorn processes (default: 4)")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent client connections (default: 16)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load (default: 10)")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds of untimed load first (default: 2)")
+    parser.add_argument("--log", help="access log whose GET requests make up the traffic mix")
+    args = parser.parse_args()
+
+    traffic = Traffic.from_log(args.log) if args.log else Traffic.from_mix()
+    port, stop = start_server(args.server, args.workers)
+    try:
+        if args.warmup:
+            run_load(port, traffic, args.clients, args.warmup)
+        results, elapsed = run_load(port, traffic, args.clients, args.duration)
+    finally:
+        stop()
+
+    workers = "" if args.server == "threaded" else f" ({args.workers} workers)"
+    print(f"{args.server} server{workers}, {args.clients} clients, {elapsed:.1f} s")
+    report(results, elapsed)
+    if any(not ok for _, _, ok in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Keyset (cursor) pagination over ordered listings.
+
+A cursor is the sort key of the first or last row of the current page, so
+finding a page is a binary search over the listing's keys rather than an
+OFFSET scan. Page boundaries also stay stable when rows are added.
+"""
+import base64
+import json
+from bisect import bisect_left, bisect_right
+from urllib.parse import urlencode
+
+from flask import request
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(key):
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Return the key a cursor encodes, or None if it is missing or malformed."""
+    if not token:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(key, list) or len(key) != 2:
+        return None
+    return tuple(key)
+
+
+def page_size():
+    try:
+        size = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        size = DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+class Page:
+    """One page of a listing plus the URLs of its neighbours."""
+
+    def __init__(self, items, prev_key, next_key):
+        self.items = items
+        self.prev_url = self._url("before", prev_key)
+        self.next_url = self._url("after", next_key)
+
+    @staticmethod
+    def _url(param, key):
+        if key is None:
+            return None
+        # Pairs, not a dict: filters such as ?grade=a&grade=b repeat their key
+        args = [(k, v) for k, v in request.args.items(multi=True) if k not in ("after", "before")]
+        args.append((param, encode_cursor(key)))
+        return f"{request.path}?{urlencode(args)}"
+
+    def link_header(self):
+        links = []
+        if self.prev_url:
+            links.append(f'<{self.prev_url}>; rel="prev"')
+        if self.next_url:
+            links.append(f'<{self.next_url}>; rel="next"')
+        return ", ".join(links)
+
+
+def paginate(rows, keys):
+    """
+    Return the Page of `rows` the current request asks for. `keys` holds the
+    sort key of each row, in the same (ascending) order as `rows`.
+    """
+    limit = page_size()
+    after = decode_cursor(request.args.get("after"))
+    before = decode_cursor(request.args.get("before"))
+    try:
+        if after is not None:
+            start = bisect_right(keys, after)
+            end = start + limit
+        elif before is not None:
+            end = bisect_left(keys, before)
+            start = max(0, end - limit)
+        else:
+            start, end = 0, limit
+    except TypeError:
+        # Cursor key of the wrong shape for this listing
+        start, end = 0, limit
+
+    end = min(end, len(rows))
+    items = rows[start:end]
+    prev_key = keys[start] if items and start > 0 else None
+    next_key = keys[end - 1] if items and end < len(rows) else None
+    return Page(items, prev_key, next_key)
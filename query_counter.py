@@ -0,0 +1,165 @@
+"""
+Per-request SQL query counts, N+1 detection and query budgets.
+
+Engine events count every statement a request executes and the time spent in
+it. Statements are reduced to a shape (literals and placeholders replaced by
+?), and a shape that runs REPEAT_LIMIT or more times in one request is
+flagged as a likely N+1: a query per row where one query for all rows would
+do. Views can declare the most queries they should ever need:
+
+    @app.route("/product/<slug>")
+    @query_budget(1)
+    def course_detail(slug): ...
+
+Over-budget and N+1 requests are logged as warnings, or raise
+QueryBudgetExceeded when QUERY_BUDGET_STRICT is set, so tests fail on them.
+count_queries() collects the same numbers around any block, for tests and
+bench_routes.py:
+
+    with count_queries() as log:
+        client.get("/product/some-course")
+    assert log.count <= 1 and not log.problems
+
+Catalog loads run inside uncounted(): they happen once per database change
+and are shared by every request after it. Streamed responses are checked when
+their first byte goes out; queries made while streaming the rest are not.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+
+# The same statement shape this many times in one request looks like N+1
+REPEAT_LIMIT = 3
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+PARAM_RE = re.compile(r"\?|:\w+|%\(\w+\)s|%s")
+IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)", re.I)
+SPACE_RE = re.compile(r"\s+")
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def statement_shape(statement):
+    """The statement with its literals and parameters replaced, for grouping."""
+    shape = STRING_RE.sub("?", statement)
+    shape = NUMBER_RE.sub("?", shape)
+    shape = PARAM_RE.sub("?", shape)
+    shape = IN_LIST_RE.sub("IN (?)", shape)
+    return SPACE_RE.sub(" ", shape).strip()
+
+
+class QueryLog:
+    """Queries seen in one request or one count_queries() block."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self.problems = []
+
+    def add(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, limit=REPEAT_LIMIT):
+        """[(shape, times)] for shapes run at least `limit` times."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= limit]
+
+    def check(self, budget=None, limit=REPEAT_LIMIT):
+        """Messages describing what is wrong with these queries, if anything."""
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f"{self.count} queries, budget is {budget}")
+        for shape, n in self.repeated(limit):
+            problems.append(f"likely N+1: {n}x {shape}")
+        return problems
+
+
+@contextmanager
+def count_queries():
+    """Collect every query run on this thread inside the block, and any problems flagged."""
+    log = QueryLog()
+    active = _local.__dict__.setdefault("active", [])
+    active.append(log)
+    try:
+        yield log
+    finally:
+        active.remove(log)
+
+
+@contextmanager
+def uncounted():
+    """Leave the queries run inside the block out of every count."""
+    _local.paused = getattr(_local, "paused", 0) + 1
+    try:
+        yield
+    finally:
+        _local.paused -= 1
+
+
+def query_budget(limit):
+    """Declare the most queries a view may run per request."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_counter_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_counter_start"].pop()
+    if getattr(_local, "paused", 0):
+        return
+    if has_request_context() and "queries" in g:
+        g.queries.add(statement, seconds)
+    for log in getattr(_local, "active", ()):
+        log.add(statement, seconds)
+
+
+def instrument_engine(engine):
+    """Count every statement the engine executes."""
+    from sqlalchemy import event
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def start_request():
+    g.queries = QueryLog()
+
+
+def finish_request(response):
+    log = g.pop("queries", None)
+    if log is None:
+        return response
+
+    view = current_app.view_functions.get(request.endpoint)
+    problems = log.check(getattr(view, "query_budget", None))
+    for active in getattr(_local, "active", ()):
+        active.problems.extend(f"{request.full_path.rstrip('?')}: {p}" for p in problems)
+    if current_app.config.get("SERVER_TIMING", True):
+        response.headers["X-Query-Count"] = str(log.count)
+    if problems:
+        message = f"{request.method} {request.full_path.rstrip('?')}: " + "; ".join(problems)
+        if current_app.config.get("QUERY_BUDGET_STRICT"):
+            raise QueryBudgetExceeded(message)
+        current_app.logger.warning(message)
+    return response
+
+
+def init_app(app):
+    app.before_request(start_request)
+    app.after_request(finish_request)
@@ -13,6 +13,8 @@ import time
 import json
 from bs4 import BeautifulSoup
 
+from search_index import rebuild_fts
+
 PROD_BASE = "https://www.thecloudclassroom.org"
 DB_PATH = "local.db"
 HEADERS = {
@@ -260,6 +262,9 @@ def update_database(courses_data):
                 cur.execute("INSERT INTO events_instructor (event_id, instructor_id) VALUES (?, ?)",
                             (eid, iid))
 
+    # Keep the full-text search index in sync with the updated rows
+    rebuild_fts(cur)
+
     conn.commit()
     conn.close()
     return updated
@@ -0,0 +1,186 @@
+"""
+Responsive image derivatives for static/images.
+
+Build step: python responsive_images.py [--templates] [name ...]
+
+Resizes every raster image in static/images to standard widths in AVIF (when
+Pillow supports it), WebP and the source format, under
+static/images/responsive/. Sources whose content hash is unchanged since the
+last run are skipped. --templates wraps local <img> tags in the templates in a
+<picture> whose sources and srcset come from the picture_sources() and
+responsive_attrs() Jinja helpers. The helpers render nothing for images
+without variants, so templates work before the pipeline has run.
+
+Needs Pillow (pip install Pillow) to build; serving only reads variants.json,
+through the helpers in image_variants.py.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+
+from helpers import STATIC_DIR, TEMPLATES_DIR
+from image_variants import INDEX_PATH, OUTPUT_DIR, load_index
+
+SOURCE_DIR = "images"
+
+WIDTHS = [320, 640, 960, 1280, 1920]
+RASTER_EXTS = {".jpg", ".jpeg", ".png"}
+QUALITY = {"avif": 55, "webp": 75, "jpeg": 80}
+
+# Webflow's own resized copies (name-p-500.jpeg, name-p-130x130q80.png)
+WEBFLOW_VARIANT_RE = re.compile(r"-p-\d+(x\d+q\d+)?\.\w+$")
+
+# Used for <img> tags that have neither sizes nor a width attribute
+DEFAULT_SIZES = "(max-width: 479px) 100vw, (max-width: 991px) 50vw, 33vw"
+
+IMG_TAG_RE = re.compile(r"<img\b(?:[^>{]|\{\{.*?\}\})*>", re.S)
+IMG_SRC_RE = re.compile(r"""src="(?:\{\{ asset_url\('([^']+)'\) \}\}|/static/([^"]+))\"""")
+PICTURE_SOURCES_END_RE = re.compile(r"picture_sources\('[^']*', '[^']*'\) \}\}$")
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def iter_sources(names=None):
+    """Yield static-relative paths of the source images to derive from."""
+    for name in sorted(os.listdir(os.path.join(STATIC_DIR, SOURCE_DIR))):
+        if os.path.splitext(name)[1].lower() not in RASTER_EXTS:
+            continue
+        if WEBFLOW_VARIANT_RE.search(name):
+            continue
+        if names and name not in names:
+            continue
+        yield f"{SOURCE_DIR}/{name}"
+
+
+def _save(image, path, fmt):
+    if fmt == "jpeg" and image.mode != "RGB":
+        image = image.convert("RGB")
+    options = {"optimize": True} if fmt in ("jpeg", "png") else {}
+    if fmt in QUALITY:
+        options["quality"] = QUALITY[fmt]
+    image.save(path, fmt.upper(), **options)
+
+
+def derive(source, avif):
+    """Write the variants of one source image. Returns its index entry."""
+    from PIL import Image, ImageOps
+
+    with Image.open(os.path.join(STATIC_DIR, source)) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    width = image.width
+    has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+    fallback = "png" if has_alpha else "jpeg"
+    formats = (["avif"] if avif else []) + ["webp", fallback]
+
+    stem = os.path.splitext(os.path.basename(source))[0]
+    variants = {}
+    for fmt in formats:
+        entries = []
+        for w in [w for w in WIDTHS if w < width] + [width]:
+            if fmt == fallback and w == width:
+                # The original already is the full-width fallback
+                entries.append([w, source])
+                continue
+            resized = image if w == width else image.resize(
+                (w, max(1, round(image.height * w / width))), Image.LANCZOS
+            )
+            ext = "jpg" if fmt == "jpeg" else fmt
+            out = f"{OUTPUT_DIR}/{stem}-{w}w.{ext}"
+            _save(resized, os.path.join(STATIC_DIR, out), fmt)
+            entries.append([w, out])
+        variants[fmt] = entries
+    return {"width": width, "fallback": fallback, "variants": variants}
+
+
+def build(names=None):
+    """Derive variants for new or changed sources and update variants.json."""
+    try:
+        from PIL import features
+    except ImportError:
+        sys.exit("Pillow is required to build image variants: pip install Pillow")
+
+    avif = features.check("avif")
+    os.makedirs(os.path.join(STATIC_DIR, OUTPUT_DIR), exist_ok=True)
+    index = load_index()
+    built = skipped = 0
+
+    for source in iter_sources(names):
+        digest = file_hash(os.path.join(STATIC_DIR, source))
+        entry = index.get(source)
+        if entry and entry["hash"] == digest and all(
+            os.path.exists(os.path.join(STATIC_DIR, path))
+            for entries in entry["variants"].values() for _, path in entries
+        ) and ("avif" in entry["variants"]) == avif:
+            skipped += 1
+            continue
+
+        entry = derive(source, avif)
+        entry["hash"] = digest
+        index[source] = entry
+        built += 1
+        print(f"  {source}: {', '.join(entry['variants'])} at {len(entry['variants']['webp'])} widths")
+
+    with open(INDEX_PATH, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return built, skipped
+
+
+def _attr(tag, name):
+    m = re.search(rf'\s{name}="([^"]*)"', tag)
+    return m.group(1) if m else None
+
+
+def rewrite_templates():
+    """Wrap local raster <img> tags in templates in a responsive <picture>."""
+    changed = 0
+    for name in sorted(os.listdir(TEMPLATES_DIR)):
+        if not name.endswith(".html"):
+            continue
+        path = os.path.join(TEMPLATES_DIR, name)
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        def replace(m):
+            tag = m.group(0)
+            src = IMG_SRC_RE.search(tag)
+            if not src:
+                return tag
+            asset = src.group(1) or src.group(2)
+            if os.path.splitext(asset)[1].lower() not in RASTER_EXTS:
+                return tag
+            if PICTURE_SOURCES_END_RE.search(html, 0, m.start()):
+                return tag  # already wrapped on an earlier run
+
+            width = _attr(tag, "width")
+            sizes = _attr(tag, "sizes") or (f"{width}px" if width and width.isdigit() else DEFAULT_SIZES)
+            if _attr(tag, "srcset") is None:
+                end = -2 if tag.endswith("/>") else -1
+                tag = tag[:end].rstrip() + "{{ responsive_attrs('%s', '%s') }}" % (asset, sizes) + tag[end:]
+
+            # display:contents keeps the <img> as the box the Webflow CSS lays out
+            return ('<picture style="display:contents">{{ picture_sources(\'%s\', \'%s\') }}%s</picture>'
+                    % (asset, sizes, tag))
+
+        new_html = IMG_TAG_RE.sub(replace, html)
+        if new_html != html:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(new_html)
+            changed += 1
+    return changed
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    names = [a for a in args if not a.startswith("--")]
+    built, skipped = build(names)
+    print(f"Built variants for {built} images, {skipped} unchanged")
+    if "--templates" in args:
+        print(f"Rewrote {rewrite_templates()} templates")
@@ -0,0 +1,48 @@
+"""
+Runtime side of the script bundles: the script() Jinja helper that loads a
+template's scripts from its bundle when there is one.
+
+The build step lives in js_bundle.py, which carries the minifier; this
+module is kept small because app.py imports it on every cold start.
+"""
+import json
+import os
+
+from jinja2 import pass_context
+from markupsafe import Markup, escape
+
+from helpers import STATIC_DIR
+
+BUNDLE_DIR = "js/bundles"
+INDEX_PATH = os.path.join(STATIC_DIR, BUNDLE_DIR, "bundles.json")
+
+
+def load_index():
+    try:
+        with open(INDEX_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class ScriptBundles:
+    """Jinja helper loading a template's scripts from its bundle when there is one."""
+
+    def __init__(self, asset_url):
+        self.asset_url = asset_url
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = load_index()
+        return self._index
+
+    @pass_context
+    def script(self, context, path):
+        entry = self.index.get(context.name)
+        if not entry or path not in entry["scripts"]:
+            return Markup(f'<script src="{escape(self.asset_url(path))}" type="text/javascript"></script>')
+        if path != entry["scripts"][-1]:
+            return Markup("")
+        return Markup(f'<script src="{escape(self.asset_url(entry["bundle"]))}" defer></script>')
@@ -0,0 +1,88 @@
+"""
+SQLite FTS5 full-text index over the events table.
+
+events_fts keeps its own copy of the searchable text with HTML stripped, keyed
+by rowid = events.id. setup_db.setup() builds it and recrawl_courses rebuilds
+it after every update, so /search only has to run a ranked MATCH query.
+"""
+import html
+import re
+import sqlite3
+
+from sqlalchemy import text
+
+from server_timing import timed
+
+FTS_COLUMNS = ("name", "subject", "category", "description", "course_content")
+
+# BM25 column weights, same order as FTS_COLUMNS: a hit in the course name
+# counts far more than one buried in the description
+BM25_WEIGHTS = (10.0, 5.0, 3.0, 1.0, 1.0)
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+SEARCH_SQL = f"""
+    SELECT rowid AS id, bm25(events_fts, {", ".join(str(w) for w in BM25_WEIGHTS)}) AS score
+    FROM events_fts
+    WHERE events_fts MATCH :match
+    ORDER BY score, rowid
+    LIMIT :limit
+"""
+
+
+def strip_html(value):
+    if not value:
+        return ""
+    return html.unescape(_TAG_RE.sub(" ", value))
+
+
+def create_fts(cur):
+    cur.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+            {", ".join(FTS_COLUMNS)},
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+
+
+def rebuild_fts(cur):
+    """Repopulate events_fts from the events table."""
+    create_fts(cur)
+    cur.execute("DELETE FROM events_fts")
+    rows = cur.execute(f"SELECT id, {', '.join(FTS_COLUMNS)} FROM events").fetchall()
+    cur.executemany(
+        f"INSERT INTO events_fts (rowid, {', '.join(FTS_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+        [(row[0],) + tuple(strip_html(v) for v in row[1:]) for row in rows]
+    )
+    return len(rows)
+
+
+def ensure_fts(db_path):
+    """Build events_fts in an existing database that predates it."""
+    conn = sqlite3.connect(db_path)
+    try:
+        found = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='events_fts'"
+        ).fetchone()
+        if not found:
+            rebuild_fts(conn.cursor())
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    tokens = _TOKEN_RE.findall(query)
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def search(conn, query, limit):
+    """Return [(event id, bm25 score)] for the best `limit` matches."""
+    match = match_expression(query)
+    if not match:
+        return []
+    result = conn.execute(text(SEARCH_SQL), {"match": match, "limit": limit})
+    with timed("rows"):
+        return [(row.id, row.score) for row in result]
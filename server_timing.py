@@ -0,0 +1,150 @@
+"""
+Per-request latency breakdown, sent as Server-Timing and kept per route.
+
+Each request's time is split into:
+  db      inside cursor.execute, from SQLAlchemy engine events
+  rows    turning result rows into Python objects, in timed("rows") blocks
+  render  rendering templates, from Flask's template signals
+  total   the whole request, before_request to after_request
+
+The breakdown goes out as a Server-Timing header, so browser devtools show
+it for every page. The last SAMPLE_SIZE samples of each metric are kept per
+route, and snapshot() turns them into p50/p95/p99 for /_internal/timings.
+Streamed responses are
+measured up to the first byte; rendering after that is not counted.
+"""
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from flask import (
+    before_render_template, current_app, g, has_request_context, request, template_rendered
+)
+
+METRICS = ("db", "rows", "render", "total")
+PERCENTILES = (50, 95, 99)
+SAMPLE_SIZE = 1000
+
+# Routes kept out of the statistics they report on
+INTERNAL_PREFIX = "/_internal/"
+
+
+def _add(name, seconds):
+    if has_request_context() and "timings" in g:
+        g.timings[name] += seconds
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the current request's `name` metric."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add(name, time.perf_counter() - start)
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+class RouteTimings:
+    """Rolling window of per-metric samples for each route."""
+
+    def __init__(self, size=SAMPLE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+
+    def record(self, route, timings):
+        with self._lock:
+            samples = self._samples.get(route)
+            if samples is None:
+                samples = self._samples[route] = {m: deque(maxlen=self.size) for m in METRICS}
+            for metric in METRICS:
+                samples[metric].append(timings[metric])
+            self._counts[route] = self._counts.get(route, 0) + 1
+
+    def snapshot(self):
+        """[{"route": r, "count": n, metric: {"p50": ms, ...}}], slowest p95 total first."""
+        with self._lock:
+            copied = {route: {m: sorted(s) for m, s in samples.items()}
+                      for route, samples in self._samples.items()}
+            counts = dict(self._counts)
+
+        result = []
+        for route, samples in copied.items():
+            entry = {"route": route, "count": counts[route]}
+            for metric, values in samples.items():
+                entry[metric] = {f"p{q}": round(percentile(values, q) * 1000, 3) for q in PERCENTILES}
+            result.append(entry)
+        return sorted(result, key=lambda entry: entry["total"]["p95"], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+stats = RouteTimings()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _add("db", time.perf_counter() - conn.info["query_start"].pop())
+
+
+def instrument_engine(engine):
+    """Time every statement the engine executes."""
+    from sqlalchemy import event
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _render_started(sender, template, context, **extra):
+    if "timings" in g:
+        g.render_start = time.perf_counter()
+
+
+def _render_finished(sender, template, context, **extra):
+    start = g.pop("render_start", None)
+    if start is not None:
+        _add("render", time.perf_counter() - start)
+
+
+def start_request():
+    g.timings = dict.fromkeys(METRICS, 0.0)
+    g.request_start = time.perf_counter()
+
+
+def finish_request(response):
+    timings = g.pop("timings", None)
+    if timings is None:
+        return response
+    timings["total"] = time.perf_counter() - g.pop("request_start")
+
+    rule = request.url_rule.rule if request.url_rule else "<unmatched>"
+    if not rule.startswith(INTERNAL_PREFIX):
+        stats.record(rule, timings)
+    if current_app.config.get("SERVER_TIMING", True):
+        response.headers["Server-Timing"] = ", ".join(
+            f"{m};dur={timings[m] * 1000:.2f}" for m in METRICS
+        )
+    return response
+
+
+def init_app(app):
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
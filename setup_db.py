@@ -1,10 +1,19 @@
 """
 Create a local SQLite database from seed_data.json.
 Run this once: python setup_db.py
+
+Build step: python setup_db.py --snapshot
+writes snapshot.db, a compacted and pre-indexed copy that deploys open read-only
+instead of re-seeding on every cold start (see resolve_db()).
 """
 import sqlite3
+import hashlib
 import json
 import os
+import shutil
+import sys
+
+from search_index import ensure_fts, rebuild_fts
 
 if os.environ.get("VERCEL"):
     DB_PATH = "/tmp/local.db"
@@ -12,14 +21,45 @@ else:
     DB_PATH = os.path.join(os.path.dirname(__file__), "local.db")
 
 SEED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seed_data.json")
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshot.db")
+
+# Bump whenever setup() changes the schema, so older snapshots get rebuilt
+SCHEMA_VERSION = 2
+
+# "immutable" opens the shipped snapshot in place, "copy" copies it to DB_PATH
+SNAPSHOT_MODE = os.environ.get("DB_SNAPSHOT_MODE", "immutable")
+
+
+def db_version():
+    """Version string a database built from the current seed data should carry."""
+    with open(SEED_FILE, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:16]
+    return f"{SCHEMA_VERSION}:{digest}"
 
-def setup():
+
+def read_version(path):
+    """Return the version stored in a database file, or None if it has none."""
+    if not os.path.exists(path):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key='version'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def setup(path=DB_PATH):
     # Remove existing DB to start fresh
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
+    if os.path.exists(path):
+        os.remove(path)
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(path)
     c = conn.cursor()
+    c.execute("PRAGMA journal_mode=WAL")
 
     # Create events table (with all columns including course_content, duration, videos)
     c.execute("""
@@ -96,12 +136,74 @@ def setup():
             (ei["id"], ei["event_id"], ei["instructor_id"])
         )
 
+    # Indexes for the catalog's status and name orderings and the detail JOIN
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_status ON events (status, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_name ON events (name, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_instructor_event ON events_instructor (event_id, id)")
+
+    # Build the full-text search index over the seeded courses
+    rebuild_fts(c)
+
+    c.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    c.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (db_version(),))
+
     conn.commit()
     conn.close()
-    print(f"Database created at: {DB_PATH}")
+    print(f"Database created at: {path}")
     print(f"  - {len(data['instructors'])} instructors")
     print(f"  - {len(data['events'])} courses")
     print(f"  - {len(data['events_instructor'])} instructor assignments")
 
+def build_snapshot(path=SNAPSHOT_PATH):
+    """Build a compacted, analyzed copy of the database for read-only deploys."""
+    tmp_path = path + ".tmp"
+    setup(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("ANALYZE")
+    conn.execute("INSERT INTO events_fts(events_fts) VALUES ('optimize')")
+    conn.commit()
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute("VACUUM")
+    conn.close()
+
+    os.replace(tmp_path, path)
+    print(f"Snapshot written to: {path} ({os.path.getsize(path)} bytes)")
+
+
+def resolve_db():
+    """
+    Work out which database the app should open, building one only when no
+    up-to-date copy exists. Returns (path, SQLAlchemy URL).
+    """
+    url = f"sqlite:///{DB_PATH}"
+    if not os.environ.get("VERCEL"):
+        # Local dev: keep an existing local.db, it may hold recrawled data
+        if not os.path.exists(DB_PATH):
+            setup()
+        else:
+            ensure_fts(DB_PATH)
+        return DB_PATH, url
+
+    version = db_version()
+    if read_version(SNAPSHOT_PATH) == version:
+        if SNAPSHOT_MODE == "immutable":
+            return SNAPSHOT_PATH, f"sqlite:///file:{SNAPSHOT_PATH}?mode=ro&immutable=1&uri=true"
+        if read_version(DB_PATH) != version:
+            shutil.copyfile(SNAPSHOT_PATH, DB_PATH + ".tmp")
+            os.replace(DB_PATH + ".tmp", DB_PATH)
+        return DB_PATH, url
+
+    # No usable snapshot shipped: build in /tmp, unless a warm instance already did
+    if read_version(DB_PATH) != version:
+        print("snapshot.db missing or out of date for this deploy; seeding the database "
+              "in /tmp (run python build.py before deploying)", file=sys.stderr)
+        setup()
+    return DB_PATH, url
+
+
 if __name__ == "__main__":
-    setup()
+    if "--snapshot" in sys.argv[1:]:
+        build_snapshot()
+    else:
+        setup()
@@ -0,0 +1,97 @@
+"""
+Profile app start-up the way a serverless cold start sees it.
+
+Runs a fresh interpreter with -X importtime that imports app.py and then makes
+the first request to each given path, and summarizes the import output per
+phase: wall time, time spent importing, and the top-level packages that took
+longest to import.
+
+Usage: python startup_profile.py [--top 8] [path ...]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+DEFAULT_PATHS = ["/about-us", "/courses", "/search?query=python"]
+
+PHASE_MARK = "@@phase "
+
+# Runs in the child interpreter; phase markers go to stderr so they interleave
+# with the -X importtime lines in the order things actually happened.
+CHILD = """
+import sys, time
+
+def mark(name, t0):
+    sys.stderr.write(f"@@phase {name}\\t{time.perf_counter() - t0:.6f}\\n")
+    sys.stderr.flush()
+
+t0 = time.perf_counter()
+import app
+mark("import app", t0)
+
+client = app.app.test_client()
+for path in sys.argv[1:]:
+    t0 = time.perf_counter()
+    status = client.get(path).status_code
+    mark(f"GET {path} ({status})", t0)
+"""
+
+# "import time:       self [us] |  cumulative | imported package"
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)")
+
+
+def run_child(paths):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, *paths],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        sys.exit(proc.returncode)
+    return proc.stderr.splitlines()
+
+
+def parse_phases(lines):
+    """Split importtime output into [(phase, wall seconds, {top-level package: self us})]."""
+    phases = []
+    modules = {}
+    for line in lines:
+        if line.startswith(PHASE_MARK):
+            name, wall = line[len(PHASE_MARK):].rsplit("\t", 1)
+            phases.append((name, float(wall), modules))
+            modules = {}
+            continue
+
+        m = IMPORT_LINE.match(line)
+        if not m:
+            continue
+        top = m.group(2).split(".")[0]
+        modules[top] = modules.get(top, 0) + int(m.group(1))
+    return phases
+
+
+def report(phases, top):
+    for name, wall, modules in phases:
+        imported_us = sum(modules.values())
+        print(f"=== {name} ===")
+        print(f"  wall: {wall * 1000:8.1f} ms   imports: {imported_us / 1000:8.1f} ms   packages: {len(modules)}")
+        ranked = sorted(modules.items(), key=lambda kv: kv[1], reverse=True)
+        for module, self_us in ranked[:top]:
+            print(f"    {self_us / 1000:8.1f} ms  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="*", default=DEFAULT_PATHS, help="paths to request after import")
+    parser.add_argument("--top", type=int, default=8, help="packages to list per phase")
+    args = parser.parse_args()
+
+    report(parse_phases(run_child(args.paths)), args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+// Typeahead for the course search box, from /search/suggest
+(function() {
+  var input = document.querySelector('input[type="search"][name="query"]');
+  if (!input || !window.fetch) return;
+
+  var list = document.createElement('datalist');
+  list.id = 'search-suggestions';
+  input.parentNode.appendChild(list);
+  input.setAttribute('list', list.id);
+  input.setAttribute('autocomplete', 'off');
+
+  var urls = {};
+  var timer = null;
+  var latest = '';
+
+  function show(prefix, suggestions) {
+    // Ignore answers to prefixes the user has already typed past
+    if (prefix !== latest) return;
+    urls = {};
+    list.innerHTML = '';
+    suggestions.forEach(function(s) {
+      urls[s.text] = s.url;
+      var option = document.createElement('option');
+      option.value = s.text;
+      list.appendChild(option);
+    });
+  }
+
+  input.addEventListener('input', function() {
+    var prefix = input.value.trim();
+    latest = prefix;
+    clearTimeout(timer);
+    if (!prefix) return show(prefix, []);
+    timer = setTimeout(function() {
+      fetch('/search/suggest?q=' + encodeURIComponent(prefix))
+        .then(function(response) { return response.ok ? response.json() : { suggestions: [] }; })
+        .then(function(data) { show(prefix, data.suggestions); })
+        .catch(function() {});
+    }, 120);
+  });
+
+  // Picking a suggestion goes straight to its page instead of a search
+  if (input.form) {
+    input.form.addEventListener('submit', function(event) {
+      var url = urls[input.value.trim()];
+      if (url) {
+        event.preventDefault();
+        window.location.href = url;
+      }
+    });
+  }
+})();
@@ -0,0 +1,76 @@
+"""
+Jinja bytecode cache, so cold starts load compiled templates instead of
+compiling them from source.
+
+Build step: python template_cache.py
+
+Compiles every template in templates/ into .jinja_cache/, which ships with
+the Python function (see freeze.INCLUDE_FILES). At runtime a template's
+bytecode is looked up in the writable cache directory first and then in
+.jinja_cache/; templates compiled at runtime are written to the writable
+directory. On Vercel that is /tmp/jinja_cache, since the deployment itself
+is read-only; locally it is .jinja_cache/ itself. Entries carry a checksum
+of the template source and the Python version, so a stale entry is simply
+recompiled.
+"""
+import hashlib
+import os
+import shutil
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PRECOMPILED_DIR = os.path.join(BASE_DIR, ".jinja_cache")
+RUNTIME_DIR = "/tmp/jinja_cache"
+PATTERN = "%s.cache"
+
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    """FileSystemBytecodeCache that falls back to a read-only precompiled directory."""
+
+    def __init__(self, directory, precompiled=None):
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(directory, PATTERN)
+        self.precompiled = precompiled if precompiled != directory else None
+
+    def get_cache_key(self, name, filename=None):
+        # Jinja also hashes the absolute filename, which differs between the
+        # build directory and /var/task; the name under templates/ does not
+        return hashlib.sha1(name.encode("utf-8")).hexdigest()
+
+    def load_bytecode(self, bucket):
+        super().load_bytecode(bucket)
+        if bucket.code is None and self.precompiled:
+            try:
+                with open(os.path.join(self.precompiled, PATTERN % bucket.key), "rb") as f:
+                    bucket.load_bytecode(f)
+            except FileNotFoundError:
+                pass
+
+
+def bytecode_cache():
+    directory = RUNTIME_DIR if os.environ.get("VERCEL") else PRECOMPILED_DIR
+    return TemplateBytecodeCache(directory, PRECOMPILED_DIR)
+
+
+def precompile(env):
+    """Compile every .html template into PRECOMPILED_DIR. Returns the template names."""
+    shutil.rmtree(PRECOMPILED_DIR, ignore_errors=True)
+    env.bytecode_cache = TemplateBytecodeCache(PRECOMPILED_DIR)
+    if env.cache is not None:
+        env.cache.clear()
+    names = env.list_templates(filter_func=lambda name: name.endswith(".html"))
+    for name in names:
+        env.get_template(name)
+    return names
+
+
+if __name__ == "__main__":
+    from app import app
+
+    started = time.perf_counter()
+    names = precompile(app.jinja_env)
+    size = sum(os.path.getsize(os.path.join(PRECOMPILED_DIR, f)) for f in os.listdir(PRECOMPILED_DIR))
+    print(f"Compiled {len(names)} templates into {os.path.relpath(PRECOMPILED_DIR)} "
+          f"({size / 1024:.0f} KB) in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,38 @@
+"""Verify the critical CSS build: inlined, current, and nothing render-blocking."""
+import gzip
+import os
+import re
+
+from app import app
+from critical_css import CRITICAL_BUDGET, URL_RE, critical_path, extract, fold_selectors
+
+client = app.test_client()
+
+def check(name, result):
+    print(f"  {name}: {'PASS' if result else 'FAIL'}")
+
+NOSCRIPT_RE = re.compile(r"<noscript>.*?</noscript>", re.S)
+LOCAL_HREF = r'href="/(?:static|assets)/[^"]+\.css"'
+
+for template, (used, sheets, route) in sorted(fold_selectors().items()):
+    if not os.path.exists(critical_path(template)):
+        continue
+    with open(critical_path(template), encoding="utf-8") as f:
+        css = f.read()
+    html = client.get(route).data.decode()
+    head = html.split("</head>", 1)[0]
+    outside_noscript = NOSCRIPT_RE.sub("", head)
+    preloads = re.findall(rf'<link {LOCAL_HREF} rel="preload" as="style"', head)
+    fallbacks = re.findall(rf'<noscript><link {LOCAL_HREF} rel="stylesheet"', head)
+
+    print(f'=== {template} ({route}) ===')
+    check('Critical CSS inlined in head', '<style data-critical>' in head)
+    check('Inlined before the stylesheets', head.find('<style data-critical>') < head.find('rel="preload" as="style"'))
+    check('Critical CSS is current', css == extract(used, sheets))
+    check('No render-blocking local stylesheets', not re.search(rf'{LOCAL_HREF} rel="stylesheet"', outside_noscript))
+    check('Every stylesheet preloaded', len(preloads) == len(sheets))
+    check('Noscript fallback per stylesheet', len(fallbacks) == len(preloads))
+    check('url()s resolve when inlined', all(re.match(r"(?:/|data:|https?:|#)", u.strip()) for _, u in URL_RE.findall(css)))
+    check(f'Under {CRITICAL_BUDGET // 1024} KB gzipped', len(gzip.compress(css.encode())) <= CRITICAL_BUDGET)
+
+print("\nAll tests complete!")
@@ -58,4 +58,17 @@ print('=== courses.html ===')
 check('Course cards', 'course-card' in html or 'card product' in html or 'w-dyn-item' in html)
 check('VIEW ALL COURSES', 'VIEW ALL COURSES' in html or 'ALL COURSES' in html or 'all-courses' in html)
 
+# Paging through a multi-value facet keeps every value
+from urllib.parse import parse_qs, urlsplit
+import re
+url, seen, grades = '/courses?grade=Grade%209&grade=Grade%2010&limit=5', 0, set()
+while url:
+    response = client.get(url)
+    grades.add(tuple(parse_qs(urlsplit(url).query).get('grade', [])))
+    seen += response.data.decode().count('class="course-card-wrapper')
+    m = re.search(r'<([^>]+)>; rel="next"', response.headers.get('Link', ''))
+    url = m and m.group(1)
+check('Paged facets keep all values', grades == {('Grade 9', 'Grade 10')})
+check('Paged facets cover every match', seen == len(client.get('/courses?grade=Grade%209&grade=Grade%2010&limit=100').data.decode().split('class="course-card-wrapper')) - 1)
+
 print("\nAll tests complete!")